@@ -1,4 +1,5 @@
 import streamlit as st
+from app.lazy import prewarm
 
 st.set_page_config(page_title="Skill-Course Matching App", layout="centered")
 
@@ -35,3 +36,7 @@ Use the **sidebar** on the left to:
 - Head over to **Task 4** to explore Student Struggles and Adaptive Learning Insights
 - Head over to **Task 5** to discover Employee Success Stories & Career Pathways
 """)
+
+# Import the Task pages' heavy libraries in the background while the user
+# reads this page (APP_PREWARM_IMPORTS=0 turns it off)
+prewarm()
@@ -0,0 +1,194 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+import streamlit as st
+
+from app.cluster_model import load_cluster_model, load_model
+from app.core import DATA_DIR, dataset_version, load_dataset, run_query
+from app.skill_matrix import load_skill_demand
+from app.struggles import DEFAULT_THRESHOLDS, SUBJECTS, load_struggles
+
+# Dataset-wide summaries the pages show, which only change with the data.
+# `python preprocess.py` computes each one for its `materialize` parameter
+# sets (default: no parameters) and stores it as a small Arrow file under
+# AGGREGATE_DIR, tagged with the version of its inputs: the datasets it reads
+# and, for cluster summaries, the clustering model version. Pages read the
+# stored table while that version is current and recompute otherwise.
+
+
+def _clustered_students(model, k):
+    # student_mat features with each student's cluster among k, as on Task3
+    df = load_dataset("student_mat_features")
+    df['Cluster'] = model.predict(model.transform(df.to_numpy(dtype=float)), k)
+    return df
+
+def _cluster_summary(model, k):
+    return _clustered_students(model, k).groupby('Cluster')[['G1', 'G2', 'G3', 'studytime', 'failures']].mean()
+
+def _cluster_features(model, k):
+    # Every feature column but the last, as Task3's heatmap has always shown
+    df = _clustered_students(model, k)
+    return df.groupby('Cluster')[df.columns[:-2]].mean()
+
+def _missing_values(dataset):
+    return load_dataset(dataset).isnull().sum().sum()
+
+def _course_skill_counts():
+    return load_dataset("course_catalog")['skills_list'].explode().value_counts().to_frame()
+
+def _struggle_means(thresholds):
+    means = run_query(load_struggles(thresholds), group_by=['struggle_count'],
+                      aggregate={col: (col, 'mean') for col in SUBJECTS})
+    return means.set_index('struggle_count').round(1)
+
+# Registry of aggregates: `inputs` are the datasets (or a function of the
+# parameters returning them), `model` a clustering model whose version also
+# keys the result and which compute() gets as `model`, and
+# `compute(**params)` returns a DataFrame, or a scalar stored as a one-cell
+# table.
+AGGREGATES = {
+    "missing_values": {
+        "inputs": lambda dataset: (dataset,),
+        "compute": _missing_values,
+        "materialize": [{"dataset": "course_catalog"}, {"dataset": "students_performance"}],
+    },
+    "course_skill_counts": {"inputs": ("course_catalog",), "compute": _course_skill_counts},
+    "job_skill_frequencies": {
+        "inputs": ("courses", "jobs"),
+        "compute": lambda: load_skill_demand().skill_frequencies(),
+    },
+    "cluster_summary": {
+        "inputs": ("student_mat_features",),
+        "model": "student_mat",
+        "compute": _cluster_summary,
+        "materialize": [{"k": k} for k in range(2, 11)],
+    },
+    "cluster_features": {
+        "inputs": ("student_mat_features",),
+        "model": "student_mat",
+        "compute": _cluster_features,
+        "materialize": [{"k": k} for k in range(2, 11)],
+    },
+    "struggle_statistics": {
+        "inputs": ("students_performance",),
+        "compute": lambda thresholds: load_struggles(thresholds).describe(),
+        "materialize": [{"thresholds": DEFAULT_THRESHOLDS}],
+    },
+    "struggle_means": {
+        "inputs": ("students_performance",),
+        "compute": _struggle_means,
+        "materialize": [{"thresholds": DEFAULT_THRESHOLDS}],
+    },
+}
+AGGREGATE_DIR = os.path.join(DATA_DIR, ".aggregates")
+
+
+def _params_key(params):
+    return json.dumps(params, sort_keys=True)
+
+def aggregate_path(name, params):
+    if not params:
+        return os.path.join(AGGREGATE_DIR, f"{name}.arrow")
+    digest = hashlib.sha1(_params_key(params).encode()).hexdigest()[:12]
+    return os.path.join(AGGREGATE_DIR, f"{name}.{digest}.arrow")
+
+def aggregate_version(name, params, model=None):
+    # Versions of everything the aggregate is computed from, as a string;
+    # `model` is the clustering model it is computed with, if it takes one
+    spec = AGGREGATES[name]
+    inputs = spec["inputs"](**params) if callable(spec["inputs"]) else spec["inputs"]
+    version = {"datasets": [dataset_version(dataset) for dataset in inputs]}
+    if spec.get("model"):
+        version["model"] = model.version
+    return json.dumps(version)
+
+def _compute(name, params, model):
+    spec = AGGREGATES[name]
+    return spec["compute"](**params, **({"model": model} if spec.get("model") else {}))
+
+def read_aggregate(name, params, version):
+    # The stored table, or None if it is missing, was computed from other
+    # inputs, or pyarrow is not available
+    path = aggregate_path(name, params)
+    if not os.path.exists(path):
+        return None
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return None
+    with pa.OSFile(path, "rb") as source:
+        table = pa.ipc.open_file(source).read_all()
+    if (table.schema.metadata or {}).get(b"aggregate_version") != version.encode():
+        return None
+    df = table.to_pandas()
+    return df.iat[0, 0] if table.schema.metadata.get(b"scalar") else df
+
+def save_aggregate(name, params, version, value):
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return
+    scalar = not isinstance(value, pd.DataFrame)
+    df = pd.DataFrame({name: [value]}) if scalar else value
+    table = pa.Table.from_pandas(df, preserve_index=not scalar)
+    table = table.replace_schema_metadata({**table.schema.metadata, b"aggregate_version": version.encode(),
+                                           b"scalar": b"1" if scalar else b""})
+    path = aggregate_path(name, params)
+    # Workers may store the same aggregate at once; each writes its own file
+    tmp = f"{path}.{os.getpid()}.tmp"
+    os.makedirs(AGGREGATE_DIR, exist_ok=True)
+    with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp, path)
+
+def _is_materialized(name, params):
+    return params in AGGREGATES[name].get("materialize", [{}])
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def _cached_aggregate(name, key, version, _model):
+    params = json.loads(key)
+    value = read_aggregate(name, params, version)
+    if value is None:
+        value = _compute(name, params, _model)
+        # Stored for the other workers; ad hoc parameters stay in memory
+        if _is_materialized(name, params):
+            save_aggregate(name, params, version, value)
+    return value
+
+def load_aggregate(name, **params):
+    """An aggregate for the current version of its inputs.
+
+    Read from its stored table when that was computed from the same inputs,
+    otherwise computed here; either way once per process and version. Frames
+    are shared, so callers get a shallow copy.
+    """
+    spec = AGGREGATES[name]
+    model = load_cluster_model(spec["model"]) if spec.get("model") else None
+    value = _cached_aggregate(name, _params_key(params), aggregate_version(name, params, model), model)
+    return value.copy(deep=False) if isinstance(value, pd.DataFrame) else value
+
+def materialize_aggregates(names=None):
+    """Compute and store every materialized aggregate whose stored table is
+    missing or stale. Returns the numbers written, up to date and skipped.
+
+    Cluster summaries use the stored model as it is (load_model): it is
+    neither trained nor updated here, which is update_models.py's job, and
+    they are skipped when there is no stored model yet.
+    """
+    written = current = skipped = 0
+    for name in names or AGGREGATES:
+        spec = AGGREGATES[name]
+        model = load_model(spec["model"]) if spec.get("model") else None
+        for params in spec.get("materialize", [{}]):
+            if spec.get("model") and model is None:
+                skipped += 1
+                continue
+            version = aggregate_version(name, params, model)
+            if read_aggregate(name, params, version) is not None:
+                current += 1
+                continue
+            save_aggregate(name, params, version, _compute(name, params, model))
+            written += 1
+    return written, current, skipped
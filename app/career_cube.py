@@ -0,0 +1,56 @@
+import numpy as np
+import streamlit as st
+
+from app.core import dataset_version, load_dataset
+
+# Dimensions of the HR aggregate cube, and the additive measures kept per cell
+CUBE_DIMENSIONS = ['Department', 'EducationField', 'JobRole', 'Education']
+CUBE_MEASURES = ['count', 'income_sum', 'income_sq_sum']
+
+
+def build_cube(df):
+    """Employee counts and monthly income stats per CUBE_DIMENSIONS cell.
+
+    Cells are in order of first appearance, so rolled-up values keep the
+    order a groupby(sort=False) over the raw rows would give. Sums, sums of
+    squares, minima and maxima roll up exactly to any coarser grouping.
+    """
+    income = df['MonthlyIncome'].astype(float)
+    grouped = df.assign(_income=income, _income_sq=income ** 2).groupby(CUBE_DIMENSIONS, sort=False, observed=True)
+    return grouped.agg(
+        count=('_income', 'size'),
+        income_sum=('_income', 'sum'),
+        income_sq_sum=('_income_sq', 'sum'),
+        income_min=('_income', 'min'),
+        income_max=('_income', 'max'),
+    ).reset_index()
+
+def rollup(cube, dimensions, where=None, sort=False):
+    # Cube aggregated to `dimensions`, optionally restricted to cells whose
+    # columns equal the values in `where`, with mean and std of income derived
+    if where:
+        mask = np.ones(len(cube), dtype=bool)
+        for col, value in where.items():
+            mask &= (cube[col] == value).to_numpy()
+        cube = cube[mask]
+    grouped = cube.groupby(list(dimensions), sort=sort, observed=True)
+    rolled = grouped[CUBE_MEASURES].sum()
+    rolled['income_min'] = grouped['income_min'].min()
+    rolled['income_max'] = grouped['income_max'].max()
+    rolled['income_mean'] = rolled['income_sum'] / rolled['count']
+    variance = rolled['income_sq_sum'] / rolled['count'] - rolled['income_mean'] ** 2
+    rolled['income_std'] = np.sqrt(variance.clip(lower=0))
+    return rolled.reset_index()
+
+def dimension_values(cube, col):
+    # Distinct values of one dimension, in order of first appearance
+    return cube[col].unique().tolist()
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _cached_cube(name, version):
+    return build_cube(load_dataset(name))
+
+def load_career_cube(name="hr_clean"):
+    # Built once per dataset version
+    return _cached_cube(name, dataset_version(name)).copy(deep=False)
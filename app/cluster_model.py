@@ -0,0 +1,238 @@
+import contextlib
+import json
+import os
+import time
+from importlib.metadata import version
+
+import streamlit as st
+
+from app.clustering import feature_hash, kmeans_sweep
+from app.core import DATA_DIR, dataset_version, load_dataset
+from app.jobs import run_job, submit_job
+from app.lazy import lazy_import
+
+cluster = lazy_import("sklearn.cluster")
+decomposition = lazy_import("sklearn.decomposition")
+preprocessing = lazy_import("sklearn.preprocessing")
+joblib = lazy_import("joblib")
+
+# Persisted models: the dataset and feature columns they cluster (None: all)
+# and the ks they keep a k-means model for
+CLUSTER_MODELS = {
+    "student_mat": {"dataset": "student_mat_features", "columns": None, "ks": tuple(range(1, 11))},
+    "students_performance": {"dataset": "students_performance",
+                             "columns": ("math_score", "reading_score", "writing_score"), "ks": (3,)},
+}
+MODEL_DIR = os.path.join(DATA_DIR, ".models")
+# Relative rise of the appended rows' mean squared distance to their nearest
+# centroid, over its value at the last full fit, above which a model is
+# refitted from scratch instead of updated
+DRIFT_THRESHOLD = float(os.environ.get("APP_DRIFT_THRESHOLD", "0.25"))
+# Versions kept on disk per model, CURRENT included
+KEEP_VERSIONS = 5
+
+
+class ClusterModel:
+    """Scaler, k-means models for several ks and a PCA projection, updatable in place.
+
+    fit() runs the cached k-means sweep and seeds one MiniBatchKMeans per k
+    with its centroids and cluster sizes, so predictions match the batch fit.
+    partial_fit() then folds appended rows into the centroids and the
+    principal components without revisiting older rows. The scaler stays as
+    fitted until the next full fit: the centroids live in its scaled space,
+    and moving it would shift every row away from them.
+    predict, inertia and project take features already passed through
+    transform.
+    """
+
+    def __init__(self, ks, n_components=2, random_state=42):
+        self.ks = tuple(ks)
+        self.n_components = n_components
+        self.random_state = random_state
+        self.version = 0
+        self.n_rows = 0
+        self.prefix_hash = None
+        self.history = []
+
+    def fit(self, X, progress=None):
+        self.scaler = preprocessing.StandardScaler().fit(X)
+        X_scaled = self.scaler.transform(X)
+        fits = kmeans_sweep(X_scaled, self.ks, random_state=self.random_state, progress=progress)
+        self.kmeans = {}
+        for k, fit in fits.items():
+            # One pass over all rows at the fitted centroids sets the per-cluster
+            # counts that weight later updates; the centroids stay put
+            model = cluster.MiniBatchKMeans(n_clusters=k, init=fit.model.cluster_centers_, n_init=1,
+                                            reassignment_ratio=0, random_state=self.random_state)
+            self.kmeans[k] = model.partial_fit(X_scaled)
+        # Mean squared distance to the nearest centroid, the drift reference
+        self.reference = {k: fit.inertia / len(X) for k, fit in fits.items()}
+        self.pca = decomposition.IncrementalPCA(n_components=self.n_components).partial_fit(X_scaled)
+        self.n_rows = self.fit_rows = len(X)
+        return self
+
+    def drift(self, X_new):
+        # Worst relative rise, over the ks, of the mean squared distance to the
+        # nearest centroid on X_new against the last full fit. Callers pass
+        # every row since that fit (X[fit_rows:]), not just the latest batch,
+        # so small batches do not make a noisy estimate.
+        X_scaled = self.transform(X_new)
+        return max(self.inertia(X_scaled, k) / len(X_new) / max(self.reference[k], 1e-12) - 1 for k in self.ks)
+
+    def partial_fit(self, X_new):
+        X_scaled = self.transform(X_new)
+        for model in self.kmeans.values():
+            model.partial_fit(X_scaled)
+        # IncrementalPCA needs at least n_components rows per batch; smaller
+        # batches only move the centroids
+        if len(X_new) >= self.n_components:
+            self.pca.partial_fit(X_scaled)
+        self.n_rows += len(X_new)
+        return self
+
+    def transform(self, X):
+        return self.scaler.transform(X)
+
+    def predict(self, X_scaled, k):
+        return self.kmeans[k].predict(X_scaled)
+
+    def inertia(self, X_scaled, k):
+        return -self.kmeans[k].score(X_scaled)
+
+    def project(self, X_scaled):
+        return self.pca.transform(X_scaled)
+
+
+def cluster_features(name):
+    # Float feature matrix of a CLUSTER_MODELS entry, in dataset row order
+    spec = CLUSTER_MODELS[name]
+    df = load_dataset(spec["dataset"])
+    return df[list(spec["columns"] or df.columns)].to_numpy(dtype=float)
+
+def _current_path(name):
+    return os.path.join(MODEL_DIR, name, "CURRENT.json")
+
+def load_model(name):
+    """The current stored version of a model, or None when there is none or
+    it cannot be used (unreadable, or pickled by another scikit-learn)."""
+    try:
+        with open(_current_path(name)) as f:
+            current = json.load(f)
+        if current["sklearn"] != version("scikit-learn"):
+            return None
+        return joblib.load(os.path.join(MODEL_DIR, name, current["file"]))
+    except (OSError, ValueError, KeyError, EOFError):
+        return None
+
+def save_model(name, model):
+    # Writes the next version and then swaps CURRENT.json to it, both through
+    # os.replace so readers see either the old or the new version
+    directory = os.path.join(MODEL_DIR, name)
+    os.makedirs(directory, exist_ok=True)
+    versions = sorted(f for f in os.listdir(directory) if f.startswith("v") and f.endswith(".joblib"))
+    # Numbered after the newest file on disk, which may be newer than the model
+    # (refits, or versions pickled by another scikit-learn)
+    model.version = max([int(f[1:-len(".joblib")]) for f in versions] + [model.version]) + 1
+    filename = f"v{model.version:04d}.joblib"
+    joblib.dump(model, os.path.join(directory, filename + ".tmp"))
+    os.replace(os.path.join(directory, filename + ".tmp"), os.path.join(directory, filename))
+
+    current = {"version": model.version, "file": filename, "rows": model.n_rows,
+               "sklearn": version("scikit-learn"), **model.history[-1]}
+    tmp = _current_path(name) + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(current, f, indent=2)
+    os.replace(tmp, _current_path(name))
+
+    for old in (versions + [filename])[:-KEEP_VERSIONS]:
+        os.remove(os.path.join(directory, old))
+
+@contextlib.contextmanager
+def _model_lock(name):
+    # Held while a model is loaded, updated and saved, so update_models.py and
+    # the server's model jobs (or several servers) take turns: the later one
+    # then finds the model up to date instead of fitting it again. Without
+    # fcntl (Windows) updates are not serialized.
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    directory = os.path.join(MODEL_DIR, name)
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, ".lock"), "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def update_model(name, refit=False, progress=None):
+    """Bring the stored model of `name` up to date with its dataset and return it.
+
+    Rows appended since the stored version are folded in by partial_fit. The
+    model is fitted from scratch instead when there is no usable stored
+    version, when earlier rows changed, when the rows appended since the last
+    full fit drift beyond DRIFT_THRESHOLD, or on refit=True. Every change is saved as a new version.
+    A full fit calls progress(k, fit) as each k of its sweep is done. Other
+    processes updating the same model wait for this one.
+    """
+    with _model_lock(name):
+        return _update_model(name, refit, progress)
+
+def _update_model(name, refit, progress):
+    X = cluster_features(name)
+    model = load_model(name)
+    drift = None
+    if model is None or refit:
+        reason = "refit" if refit else "initial"
+    elif model.n_rows > len(X) or feature_hash(X[:model.n_rows]) != model.prefix_hash:
+        reason = "rows changed"
+    elif model.n_rows == len(X):
+        return model
+    else:
+        drift = model.drift(X[model.fit_rows:])
+        reason = "drift" if drift > DRIFT_THRESHOLD else None
+
+    if reason is None:
+        added = len(X) - model.n_rows
+        model.partial_fit(X[model.n_rows:])
+        kind = "update"
+    else:
+        previous = model
+        model = ClusterModel(CLUSTER_MODELS[name]["ks"]).fit(X, progress=progress)
+        if previous is not None:
+            model.version, model.history = previous.version, previous.history
+        added, kind = len(X), "fit"
+    model.prefix_hash = feature_hash(X)
+    model.history.append({"kind": kind, "reason": reason, "rows_added": added,
+                          "drift": None if drift is None else round(float(drift), 4), "time": time.time()})
+    save_model(name, model)
+    return model
+
+
+def _update_job(job, name):
+    # A full fit reports one (k, inertia) elbow point per k as it finishes
+    ks = CLUSTER_MODELS[name]["ks"]
+    progress = lambda k, fit: job.report(len(job.partial) + 1, len(ks), partial=(k, fit.inertia))
+    return update_model(name, progress=progress)
+
+def _model_key(name, version):
+    return ("cluster_model", name, version)
+
+def model_job(name):
+    """The background job bringing `name`'s model up to date with the current
+    dataset version, started by the first caller and shared by the rest.
+    Pages show its progress instead of blocking on a full fit."""
+    version = dataset_version(CLUSTER_MODELS[name]["dataset"])
+    return submit_job(_model_key(name, version), _update_job, name, label=f"Fitting the {name} clustering model")
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def _cached_model(name, version):
+    return run_job(_model_key(name, version), _update_job, name, label=f"Fitting the {name} clustering model")
+
+def load_cluster_model(name):
+    # The stored model, brought up to date once per dataset version (waiting
+    # for the page's model_job if one is running); pages only predict and
+    # project with it
+    return _cached_model(name, dataset_version(CLUSTER_MODELS[name]["dataset"]))
@@ -0,0 +1,148 @@
+import hashlib
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import streamlit as st
+
+from app.lazy import lazy_import
+
+# sklearn is imported by the first fit, not when a page imports this module
+cluster = lazy_import("sklearn.cluster")
+decomposition = lazy_import("sklearn.decomposition")
+metrics = lazy_import("sklearn.metrics")
+utils = lazy_import("sklearn.utils")
+
+# Above these row counts the sweep fans out to a thread pool, "auto" switches
+# to MiniBatchKMeans, and silhouette scores are estimated on a sample
+PARALLEL_MIN_ROWS = 20000
+MINIBATCH_MIN_ROWS = 100000
+SILHOUETTE_SAMPLE = 10000
+# Rows per block of the silhouette's distance matrix (64 MB of float64 at the
+# sample size)
+SILHOUETTE_BLOCK_ROWS = 1000
+
+KMeansFit = namedtuple("KMeansFit", ["model", "labels", "inertia"])
+
+
+def feature_hash(X):
+    X = np.ascontiguousarray(X)
+    digest = hashlib.sha256(repr((X.shape, X.dtype.str)).encode())
+    digest.update(X.data)
+    return digest.hexdigest()
+
+def _resolve_method(method, n_rows):
+    if method == "auto":
+        return "minibatch" if n_rows >= MINIBATCH_MIN_ROWS else "kmeans"
+    return method
+
+def _fit_kmeans(X, k, method, random_state):
+    if method == "minibatch":
+        model = cluster.MiniBatchKMeans(n_clusters=k, random_state=random_state, n_init="auto")
+    else:
+        model = cluster.KMeans(n_clusters=k, random_state=random_state)
+    labels = model.fit_predict(X)
+    labels.setflags(write=False)
+    return KMeansFit(model, labels, model.inertia_)
+
+
+@st.cache_resource(show_spinner=False)
+def _model_store():
+    # Fitted models, silhouettes and projections shared by every session,
+    # keyed by feature hash and parameters
+    return {"lock": threading.Lock(), "results": {}}
+
+def _cached(key, compute):
+    store = _model_store()
+    with store["lock"]:
+        if key in store["results"]:
+            return store["results"][key]
+    value = compute()
+    with store["lock"]:
+        return store["results"].setdefault(key, value)
+
+
+def kmeans_sweep(X, ks, method="auto", random_state=42, progress=None):
+    """Fit (or look up) one k-means model per k and return {k: KMeansFit}.
+
+    Models are cached by feature hash, k and method, so moving a slider over
+    ks that were already swept is a lookup. Missing ks are fitted in parallel
+    on a thread pool for large inputs (k-means releases the GIL). progress(k,
+    fit) is called as each k is done; if it raises, fits not yet started are
+    dropped.
+    """
+    ks = list(ks)
+    fingerprint = feature_hash(X)
+    method = _resolve_method(method, len(X))
+    key = lambda k: ("kmeans", fingerprint, k, method, random_state)
+
+    fits = {}
+    def done(k, fit):
+        fits[k] = fit
+        if progress is not None:
+            progress(k, fit)
+
+    results = _model_store()["results"]
+    missing = [k for k in ks if key(k) not in results]
+    if len(missing) > 1 and len(X) >= PARALLEL_MIN_ROWS:
+        # Threads, not processes: under Streamlit __main__ is the page script,
+        # which spawned workers would re-run on start-up
+        workers = min(len(missing), os.cpu_count() or 1)
+        pool = ThreadPoolExecutor(max_workers=workers)
+        try:
+            futures = {pool.submit(_fit_kmeans, X, k, method, random_state): k for k in missing}
+            for future in as_completed(futures):
+                k = futures[future]
+                done(k, _cached(key(k), future.result))
+        finally:
+            pool.shutdown(cancel_futures=True)
+    for k in ks:
+        if k not in fits:
+            done(k, _cached(key(k), lambda k=k: _fit_kmeans(X, k, method, random_state)))
+    return {k: fits[k] for k in ks}
+
+def silhouette(X, labels, random_state=42, progress=None):
+    """Mean silhouette coefficient, exact up to SILHOUETTE_SAMPLE rows and
+    estimated on a sample above that, as metrics.silhouette_score (same
+    sample for the same random_state). Computed one block of rows at a time,
+    calling progress(rows_done, rows) after each; if it raises, the
+    computation stops there."""
+    sample_size = SILHOUETTE_SAMPLE if len(X) > SILHOUETTE_SAMPLE else None
+    key = ("silhouette", feature_hash(X), feature_hash(labels), sample_size, random_state)
+    return _cached(key, lambda: _silhouette(X, labels, sample_size, random_state, progress))
+
+def _silhouette(X, labels, sample_size, random_state, progress):
+    if sample_size is not None:
+        indices = utils.check_random_state(random_state).permutation(len(X))[:sample_size]
+        X, labels = X[indices], labels[indices]
+    _, labels = np.unique(labels, return_inverse=True)
+    n_labels = labels.max() + 1
+    if not 1 < n_labels < len(X):
+        raise ValueError(f"Number of labels is {n_labels}. Valid values are 2 to n_samples - 1 (inclusive)")
+    sizes = np.bincount(labels)
+    members = np.eye(n_labels)[labels]
+    scores = np.empty(len(X))
+    for start in range(0, len(X), SILHOUETTE_BLOCK_ROWS):
+        block = slice(start, start + SILHOUETTE_BLOCK_ROWS)
+        # Summed distance from each row in the block to each cluster's rows
+        sums = metrics.pairwise_distances(X[block], X) @ members
+        own = labels[block]
+        rows = np.arange(len(own))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            intra = sums[rows, own] / (sizes[own] - 1)
+            sums[rows, own] = np.inf
+            inter = (sums / sizes).min(axis=1)
+            # 0 for rows alone in their cluster (0 / 0), as scikit-learn does
+            scores[block] = np.nan_to_num((inter - intra) / np.maximum(intra, inter))
+        if progress is not None:
+            progress(min(start + SILHOUETTE_BLOCK_ROWS, len(X)), len(X))
+    return float(scores.mean())
+
+def pca_projection(X, n_components=2):
+    def compute():
+        reduced = decomposition.PCA(n_components=n_components).fit_transform(X)
+        reduced.setflags(write=False)
+        return reduced
+    return _cached(("pca", feature_hash(X), n_components), compute)
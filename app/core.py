@@ -1,8 +1,735 @@
+import ast
+import contextlib
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import shutil
+import threading
+import time
+import tracemalloc
+import numpy as np
 import pandas as pd
+import streamlit as st
 
-def load_data(path="app/data.csv"):
-    return pd.read_csv(path)
+from app.storage import DATA_DIR, SHARED_DIR, read_skills_artifact, skills_artifact_path
 
-def process_data(df):
-    # Your custom processing logic
-    return df.describe()
+# Cached frames are shared by every session, so pages get shallow copies and
+# must never write into them in place; copy-on-write makes that hold for any
+# derived frame (it is always on from pandas 3)
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+
+def load_preprocessed(csv_path, **options):
+    # Load a *_preprocessed.csv with skills_list as Python lists. The scalar
+    # columns come from the CSV (read with `options`, as for pd.read_csv);
+    # skills_list comes from the Arrow artifact without parsing, falling back
+    # to ast.literal_eval on the CSV column.
+    skills = read_skills_artifact(csv_path)
+    if skills is not None:
+        usecols = options.pop('usecols', None)
+        keep = lambda col: col != 'skills_list' and (usecols is None or col in usecols)
+        df = pd.read_csv(csv_path, usecols=keep, **options)
+        if len(df) == len(skills):
+            df['skills_list'] = pd.Series(skills.to_pylist(), index=df.index, dtype=object)
+            return df
+        options['usecols'] = usecols
+    df = pd.read_csv(csv_path, **options)
+    df['skills_list'] = df['skills_list'].apply(ast.literal_eval)
+    return df
+
+
+# Dataset cleaning, done once per process instead of on every rerun
+
+def parse_review_count(x):
+    # '16.4k' -> 16400, '950' -> 950, anything else -> NaN
+    if isinstance(x, str) and 'k' in x:
+        return int(float(x.replace('k', '')) * 1000)
+    return int(x) if str(x).isdigit() else np.nan
+
+def parse_review_counts(values):
+    # Vectorized parse_review_count over a column
+    text = values.astype(object).where(values.notna(), '').astype(str)
+    thousands = np.trunc(pd.to_numeric(text.str.replace('k', '', regex=False), errors='coerce') * 1000)
+    plain = pd.to_numeric(text.where(text.str.isdigit()), errors='coerce')
+    return thousands.where(text.str.contains('k', regex=False), plain).astype('Int32')
+
+# Months per unit of the durations in the course catalog
+_DURATION_UNITS = {'hour': 1 / 730, 'week': 12 / 52, 'month': 1, 'mes': 1, 'year': 12}
+_DURATION_PATTERN = (r'(?P<low>\d+(?:\.\d+)?)(?:\s*(?:-|–|to|a|or)\s*(?P<high>\d+(?:\.\d+)?))?\+?\s*'
+                     r'(?P<unit>hour|week|month|mes|year)')
+
+def parse_duration_months(values):
+    # ' 3 - 6 Months' -> (3, 6), ' 1 - 4 Weeks' -> (0.23, 0.92), ' 2 years' -> (24, 24);
+    # NaN where no range is recognized
+    parts = values.astype(object).where(values.notna(), '').astype(str).str.lower().str.extract(_DURATION_PATTERN)
+    factor = parts['unit'].map(_DURATION_UNITS).astype(float)
+    low = pd.to_numeric(parts['low'], errors='coerce') * factor
+    high = pd.to_numeric(parts['high'], errors='coerce').fillna(pd.to_numeric(parts['low'], errors='coerce')) * factor
+    return low.astype('float32'), high.astype('float32')
+
+def _clean_courses(df):
+    df['skills'] = df['skills'].fillna('')
+    df['reviewcount'] = parse_review_counts(df['reviewcount'])
+    df['duration_min_months'], df['duration_max_months'] = parse_duration_months(df['duration'])
+    return df
+
+def _clean_course_catalog(df):
+    df['level'] = df['level'].astype(object).fillna('Unknown').str.strip().astype('category')
+    df = df.dropna(subset=['rating'])
+    df['rating'] = pd.to_numeric(df['rating'], errors='coerce')
+    df['duration'] = df['duration'].astype(object).str.replace(' Months', '').str.replace(' - ', '-')
+    return df
+
+def _clean_jobs(df):
+    df['skills'] = df['skills'].fillna('')
+    return df
+
+def _student_mat_features(df):
+    df_clean = df[['age', 'Medu', 'Fedu', 'studytime', 'failures', 'absences',
+                   'G1', 'G2', 'G3', 'schoolsup', 'famsup', 'internet']].copy()
+    # yes/no flags are read as booleans; the models want 0/1
+    for col in ['schoolsup', 'famsup', 'internet']:
+        df_clean[col] = df_clean[col].astype('int8')
+    return df_clean
+
+def _clean_students_performance(df):
+    df.columns = [col.lower().replace(" ", "_") for col in df.columns]
+    return df
+
+def _clean_hr(df):
+    # EmployeeCount, Over18, StandardHours and EmployeeNumber are never read
+    df_clean = df
+    df_clean['TotalWorkingYears'] = df_clean['TotalWorkingYears'].replace(0, df_clean['TotalWorkingYears'].median())
+    df_clean['EstimatedGraduationAge'] = df_clean['Age'] - df_clean['TotalWorkingYears']
+    return df_clean
+
+
+# Column types applied by read_csv. Low-cardinality text is categorical,
+# small-range counts and scores are int8/int16, and yes/no flags are booleans.
+# Columns no page uses are pruned with usecols.
+def _dtypes(dtype, *columns):
+    return {col: dtype for col in columns}
+
+_YES_NO = {"true_values": ["yes", "Yes"], "false_values": ["no", "No"]}
+
+_HR_COLUMNS = [
+    'Age', 'Attrition', 'BusinessTravel', 'DailyRate', 'Department', 'DistanceFromHome', 'Education',
+    'EducationField', 'EnvironmentSatisfaction', 'Gender', 'HourlyRate', 'JobInvolvement', 'JobLevel',
+    'JobRole', 'JobSatisfaction', 'MaritalStatus', 'MonthlyIncome', 'MonthlyRate', 'NumCompaniesWorked',
+    'OverTime', 'PercentSalaryHike', 'PerformanceRating', 'RelationshipSatisfaction', 'StockOptionLevel',
+    'TotalWorkingYears', 'TrainingTimesLastYear', 'WorkLifeBalance', 'YearsAtCompany', 'YearsInCurrentRole',
+    'YearsSinceLastPromotion', 'YearsWithCurrManager',
+]
+
+READ_OPTIONS = {
+    "courses": {
+        "dtype": {
+            **_dtypes("category", 'partner', 'level', 'certificatetype', 'duration'),
+            'crediteligibility': 'bool',
+        },
+    },
+    "jobs": {"dtype": _dtypes("category", 'company')},
+    "student_mat": {
+        "sep": ';',
+        "dtype": {
+            **_dtypes("category", 'school', 'sex', 'address', 'famsize', 'Pstatus', 'Mjob', 'Fjob',
+                      'reason', 'guardian'),
+            **_dtypes("int8", 'age', 'Medu', 'Fedu', 'traveltime', 'studytime', 'failures', 'famrel',
+                      'freetime', 'goout', 'Dalc', 'Walc', 'health', 'G1', 'G2', 'G3'),
+            'absences': 'int16',
+            **_dtypes("bool", 'schoolsup', 'famsup', 'paid', 'activities', 'nursery', 'higher',
+                      'internet', 'romantic'),
+        },
+        **_YES_NO,
+    },
+    "students_performance": {
+        "dtype": {
+            **_dtypes("category", 'gender', 'race/ethnicity', 'parental level of education', 'lunch',
+                      'test preparation course'),
+            **_dtypes("int8", 'math score', 'reading score', 'writing score'),
+        },
+    },
+    "hr_clean": {
+        "usecols": _HR_COLUMNS,
+        "dtype": {
+            **_dtypes("category", 'BusinessTravel', 'Department', 'EducationField', 'Gender', 'JobRole',
+                      'MaritalStatus'),
+            **_dtypes("int8", 'Age', 'DistanceFromHome', 'Education', 'EnvironmentSatisfaction',
+                      'JobInvolvement', 'JobLevel', 'JobSatisfaction', 'NumCompaniesWorked',
+                      'PercentSalaryHike', 'PerformanceRating', 'RelationshipSatisfaction',
+                      'StockOptionLevel', 'TotalWorkingYears', 'TrainingTimesLastYear', 'WorkLifeBalance',
+                      'YearsAtCompany', 'YearsInCurrentRole', 'YearsSinceLastPromotion',
+                      'YearsWithCurrManager'),
+            **_dtypes("int16", 'DailyRate', 'HourlyRate'),
+            **_dtypes("int32", 'MonthlyIncome', 'MonthlyRate'),
+            **_dtypes("bool", 'Attrition', 'OverTime'),
+        },
+        **_YES_NO,
+    },
+}
+
+# Registry of every dataset the pages use. A dataset is either read from
+# `path` with `read` (given its READ_OPTIONS), or derived from another
+# registered dataset (`source`), and then passed through `clean`.
+DATASETS = {
+    "courses": {
+        "path": os.path.join(DATA_DIR, "courses_preprocessed.csv"),
+        "read": load_preprocessed,
+        "clean": _clean_courses,
+    },
+    "course_catalog": {"source": "courses", "clean": _clean_course_catalog},
+    "jobs": {
+        "path": os.path.join(DATA_DIR, "jobs_preprocessed.csv"),
+        "read": load_preprocessed,
+        "clean": _clean_jobs,
+    },
+    "student_mat": {
+        "path": os.path.join(DATA_DIR, "3_student-mat.csv"),
+        "read": pd.read_csv,
+    },
+    "student_mat_features": {"source": "student_mat", "clean": _student_mat_features},
+    "students_performance": {
+        "path": os.path.join(DATA_DIR, "StudentsPerformance.csv"),
+        "read": pd.read_csv,
+        "clean": _clean_students_performance,
+    },
+    "hr_clean": {
+        "path": os.path.join(DATA_DIR, "4_Employee_HR-Employee-Attrition-dataset.csv"),
+        "read": pd.read_csv,
+        "clean": _clean_hr,
+    },
+}
+
+def read_dataset(name, typed=True):
+    # Raw frame of a file-backed dataset, before `clean`; typed=False reads
+    # with pandas' default dtypes and all columns (for memory comparisons)
+    spec = DATASETS[name]
+    options = dict(READ_OPTIONS.get(name, {}))
+    if not typed:
+        options = {"sep": options["sep"]} if "sep" in options else {}
+    return spec["read"](spec["path"], **options)
+
+def _file_signature(path):
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+def _file_version(name):
+    spec = DATASETS[name]
+    if "source" in spec:
+        return _file_version(spec["source"])
+    path = spec["path"]
+    return (_file_signature(path), _file_signature(skills_artifact_path(path)))
+
+
+# Shared mode. With several Streamlit workers, `python preprocess.py --publish`
+# writes every dataset, already cleaned, as an Arrow IPC file into a new
+# version directory under APP_SHARED_DIR and then swaps CURRENT to it with
+# os.replace. Workers memory-map the files read-only: numeric columns are
+# zero-copy views of the shared page cache and string and list columns stay in
+# Arrow memory, so each worker no longer reads and cleans its own copy. Datasets
+# that are not published (or no APP_SHARED_DIR) load from the CSVs as before.
+
+# Published versions kept on disk; workers may still map an older one
+SHARED_KEEP_VERSIONS = 3
+
+def shared_version(shared_dir=None):
+    # Name of the version directory CURRENT points at, or None
+    shared_dir = shared_dir or SHARED_DIR
+    if not shared_dir:
+        return None
+    try:
+        with open(os.path.join(shared_dir, "CURRENT")) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def _shared_path(name):
+    version = shared_version()
+    path = version and os.path.join(SHARED_DIR, version, f"{name}.arrow")
+    return path if path and os.path.exists(path) else None
+
+def read_shared_dataset(path):
+    """Memory-mapped frame of a published dataset.
+
+    Columns with list values (skills_list) stay in Arrow memory as
+    list<string>[pyarrow] columns: iterating them or taking one value still
+    gives Python lists, but the lists are built on access instead of once per
+    worker up front. String columns the cleaned frame held as object dtype
+    get it back; everything else maps the file without copying.
+    """
+    import pyarrow as pa
+    table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+    df = table.to_pandas(split_blocks=True, types_mapper=lambda t: pd.ArrowDtype(t) if pa.types.is_list(t)
+                         or pa.types.is_large_list(t) else None)
+    object_columns = {col["name"] for col in table.schema.pandas_metadata["columns"] if col["numpy_type"] == "object"}
+    for name in object_columns & set(df.columns):
+        if df[name].dtype != object and not isinstance(df[name].dtype, pd.ArrowDtype):
+            df[name] = df[name].astype(object)
+    return df
+
+def publish_datasets(shared_dir, names=None):
+    """Read and clean datasets from their files, write them to a new version
+    directory under shared_dir and atomically point CURRENT at it.
+    Returns the version name."""
+    import pyarrow as pa
+    names = list(names or DATASETS)
+    frames = {}
+
+    def build(name):
+        # Derived datasets are cleaned from their freshly read source, never
+        # from a previously published copy
+        if name not in frames:
+            spec = DATASETS[name]
+            df = build(spec["source"]).copy(deep=False) if "source" in spec else read_dataset(name)
+            frames[name] = spec["clean"](df) if spec.get("clean") else df
+        return frames[name]
+
+    os.makedirs(shared_dir, exist_ok=True)
+    version = time.strftime("%Y%m%dT%H%M%S") + f"-{time.time_ns() % 10 ** 9:09d}"
+    staging = os.path.join(shared_dir, f".{version}.tmp")
+    os.makedirs(staging)
+    manifest = {}
+    for name in names:
+        table = pa.Table.from_pandas(build(name), preserve_index=None)
+        with pa.OSFile(os.path.join(staging, f"{name}.arrow"), "wb") as sink, \
+                pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        manifest[name] = {"rows": table.num_rows, "source": _file_version(name)}
+    with open(os.path.join(staging, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    # The directory is complete before it gets its final name, and CURRENT
+    # switches to it in one rename, so readers see either version whole
+    os.rename(staging, os.path.join(shared_dir, version))
+    with open(os.path.join(shared_dir, "CURRENT.tmp"), "w") as f:
+        f.write(version)
+    os.replace(os.path.join(shared_dir, "CURRENT.tmp"), os.path.join(shared_dir, "CURRENT"))
+
+    versions = sorted(entry for entry in os.listdir(shared_dir)
+                      if not entry.startswith(".") and os.path.isdir(os.path.join(shared_dir, entry)))
+    for old in versions[:-SHARED_KEEP_VERSIONS]:
+        # Unlinking does not disturb workers that still map these files
+        shutil.rmtree(os.path.join(shared_dir, old), ignore_errors=True)
+    return version
+
+def dataset_version(name):
+    # Changes whenever a file behind the dataset changes, including the
+    # skills_list artifact of preprocessed CSVs, or when a new shared
+    # version is published
+    path = _shared_path(name)
+    if path:
+        return ("shared", path)
+    return _file_version(name)
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def _load_dataset(name, version):
+    if version[0] == "shared":
+        return read_shared_dataset(version[1])
+    spec = DATASETS[name]
+    if "source" in spec:
+        df = load_dataset(spec["source"])
+    else:
+        df = read_dataset(name)
+    clean = spec.get("clean")
+    return clean(df) if clean else df
+
+def load_dataset(name):
+    # Loaded and cleaned once per process and dataset version, shared across
+    # pages and sessions. The shallow copy lets a page add or replace columns
+    # without touching the shared frame.
+    with stage(f"load:{name}"):
+        return _load_dataset(name, dataset_version(name)).copy(deep=False)
+
+
+# Query backends. run_query() filters, groups, aggregates, sorts and limits
+# either a file-backed dataset (scanned straight from its CSV, so only the
+# referenced columns and matching rows are read) or an in-memory frame, and
+# materializes only the result. Backends:
+#   "duckdb"  SQL on DuckDB, if installed
+#   "arrow"   pyarrow.dataset scans and Arrow compute kernels, multi-threaded
+#   "pandas"  the reference implementation, always available
+# APP_QUERY_BACKEND picks one; "auto" (the default) takes arrow, or pandas
+# without pyarrow. DuckDB only runs when asked for: on the page queries it is
+# slower than arrow, mostly spent registering the frame and planning the SQL.
+# All backends order ties by input row order, so results compare equal.
+
+QUERY_BACKEND = os.environ.get("APP_QUERY_BACKEND", "auto")
+QUERY_BACKENDS = ("duckdb", "arrow", "pandas")
+_AUTO_BACKENDS = ("arrow", "pandas")
+_COMPARISONS = ("==", "!=", "<", "<=", ">", ">=", "in")
+_AGGREGATES = ("count", "sum", "mean", "min", "max")
+
+def available_backends():
+    from importlib.util import find_spec
+    modules = {"duckdb": "duckdb", "arrow": "pyarrow.dataset", "pandas": "pandas"}
+    return [name for name in QUERY_BACKENDS if find_spec(modules[name].split('.')[0]) is not None]
+
+def query_backend(name=None):
+    name = name or QUERY_BACKEND
+    if name == "auto":
+        return next(name for name in available_backends() if name in _AUTO_BACKENDS)
+    if name not in QUERY_BACKENDS:
+        raise ValueError(f"unknown query backend {name!r}, expected one of {QUERY_BACKENDS}")
+    return name
+
+def run_query(source, columns=None, where=(), group_by=(), aggregate=None, order_by=(), limit=None, backend=None):
+    """Result of a query over a dataset name or a DataFrame, as a DataFrame.
+
+    where:     [(column, op, value)], ANDed; op is one of ==, !=, <, <=, >, >=, in
+    group_by:  key columns; with `aggregate` {output: (column, func)} for func
+               in count, sum, mean, min, max. Groups come out in key order.
+    columns:   projection when not grouping (default: all columns)
+    order_by:  [(column, ascending)], nulls last, stable
+    """
+    aggregate = aggregate or {}
+    for _, op, _ in where:
+        if op not in _COMPARISONS:
+            raise ValueError(f"unsupported comparison {op!r}")
+    for _, func in aggregate.values():
+        if func not in _AGGREGATES:
+            raise ValueError(f"unsupported aggregate {func!r}")
+    if group_by and not aggregate:
+        raise ValueError("group_by needs at least one aggregate")
+    query = {"columns": list(columns) if columns else None, "where": list(where), "group_by": list(group_by),
+             "aggregate": aggregate, "order_by": list(order_by), "limit": limit}
+    run = {"duckdb": _duckdb_query, "arrow": _arrow_query, "pandas": _pandas_query}[query_backend(backend)]
+    return run(source, query).reset_index(drop=True)
+
+def _referenced_columns(query):
+    names = list(query["columns"] or []) + list(query["group_by"])
+    names += [col for col, _, _ in query["where"]] + [col for col, _ in query["aggregate"].values()]
+    if not query["group_by"]:
+        names += [col for col, _ in query["order_by"]]
+    return list(dict.fromkeys(names)) if query["columns"] or query["group_by"] else None
+
+def _pandas_query(source, query):
+    df = read_dataset(source) if isinstance(source, str) else source
+    mask = np.ones(len(df), dtype=bool)
+    for col, op, value in query["where"]:
+        values = df[col]
+        if op == "in":
+            mask &= values.isin(list(value)).to_numpy()
+        else:
+            compare = {"==": values.eq, "!=": values.ne, "<": values.lt, "<=": values.le,
+                       ">": values.gt, ">=": values.ge}[op]
+            mask &= compare(value).fillna(False).to_numpy(dtype=bool)
+    df = df[mask]
+    if query["group_by"]:
+        grouped = df.groupby(query["group_by"], observed=True, sort=True)
+        df = grouped.agg(**{name: spec for name, spec in query["aggregate"].items()}).reset_index()
+    if query["order_by"]:
+        cols = [col for col, _ in query["order_by"]]
+        ascending = [asc for _, asc in query["order_by"]]
+        df = df.sort_values(cols, ascending=ascending, kind='stable', na_position='last')
+    if query["limit"] is not None:
+        df = df.head(query["limit"])
+    if query["columns"] and not query["group_by"]:
+        df = df[query["columns"]]
+    return df
+
+_ARROW_TYPES = {"int8": "int8", "int16": "int16", "int32": "int32", "int64": "int64", "bool": "bool",
+                "float32": "float32", "float64": "float64", "category": "string"}
+
+def _arrow_csv_dataset(name):
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    import pyarrow.dataset as ds
+    options = READ_OPTIONS.get(name, {})
+    types = {col: pa.type_for_alias(_ARROW_TYPES[dtype]) for col, dtype in options.get("dtype", {}).items()}
+    file_format = ds.CsvFileFormat(
+        parse_options=pacsv.ParseOptions(delimiter=options.get("sep", ","), newlines_in_values=True),
+        convert_options=pacsv.ConvertOptions(
+            column_types=types, strings_can_be_null=True,
+            true_values=options.get("true_values", ["True", "TRUE", "true"]),
+            false_values=options.get("false_values", ["False", "FALSE", "false"]),
+        ),
+    )
+    return ds.dataset(DATASETS[name]["path"], format=file_format)
+
+def _arrow_expression(where):
+    import pyarrow.dataset as ds
+    expression = None
+    for col, op, value in where:
+        field = ds.field(col)
+        term = field.isin(list(value)) if op == "in" else {
+            "==": field.__eq__, "!=": field.__ne__, "<": field.__lt__, "<=": field.__le__,
+            ">": field.__gt__, ">=": field.__ge__,
+        }[op](value)
+        expression = term if expression is None else expression & term
+    return expression
+
+def _arrow_query(source, query):
+    import pyarrow as pa
+    columns = _referenced_columns(query)
+    expression = _arrow_expression(query["where"])
+    if isinstance(source, str):
+        # Projection and predicate are pushed into the CSV scan
+        table = _arrow_csv_dataset(source).to_table(columns=columns, filter=expression)
+    else:
+        frame = source[columns] if columns else source
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        if expression is not None:
+            table = table.filter(expression)
+    if query["group_by"]:
+        keys = query["group_by"]
+        specs = list(query["aggregate"].values())
+        grouped = table.group_by(keys, use_threads=True).aggregate(specs)
+        result = grouped.select([f"{col}_{func}" for col, func in specs] + keys)
+        table = result.rename_columns(list(query["aggregate"]) + keys).select(keys + list(query["aggregate"]))
+        table = table.sort_by([(key, "ascending") for key in keys])
+    if query["order_by"]:
+        table = table.sort_by([(col, "ascending" if asc else "descending") for col, asc in query["order_by"]])
+    if query["limit"] is not None:
+        table = table.slice(0, query["limit"])
+    if query["columns"] and not query["group_by"]:
+        table = table.select(query["columns"])
+    return table.to_pandas()
+
+def _sql_name(col):
+    return '"' + col.replace('"', '""') + '"'
+
+_DUCKDB_TYPES = {"int8": "TINYINT", "int16": "SMALLINT", "int32": "INTEGER", "int64": "BIGINT",
+                 "float32": "FLOAT", "float64": "DOUBLE"}
+_duckdb = None
+_duckdb_lock = threading.Lock()
+_duckdb_local = threading.local()
+
+def _duckdb_cursor():
+    # One in-memory database per process; each thread queries through its own
+    # cursor on it, as DuckDB connections are not safe to share between threads
+    global _duckdb
+    cursor = getattr(_duckdb_local, "cursor", None)
+    if cursor is None:
+        import duckdb
+        with _duckdb_lock:
+            if _duckdb is None:
+                _duckdb = duckdb.connect()
+            cursor = _duckdb_local.cursor = _duckdb.cursor()
+    return cursor
+
+def _sql_string(value):
+    return "'" + value.replace("'", "''") + "'"
+
+def _duckdb_query(source, query):
+    con = _duckdb_cursor()
+    params = []
+    if isinstance(source, str):
+        options = READ_OPTIONS.get(source, {})
+        types = [f"{_sql_string(col)}: {_sql_string(_DUCKDB_TYPES[dtype])}"
+                 for col, dtype in options.get("dtype", {}).items() if dtype in _DUCKDB_TYPES]
+        # read_csv rejects an empty struct, so types is only passed when set
+        scan = "read_csv(?, delim = ?, header = true" + (f", types = {{{', '.join(types)}}})" if types else ")")
+        params += [DATASETS[source]["path"], options.get("sep", ",")]
+        table = f"(SELECT *, row_number() OVER () AS __row FROM {scan})"
+    else:
+        con.register("source_frame", source.assign(__row=np.arange(len(source))))
+        table = "source_frame"
+    conditions = []
+    for col, op, value in query["where"]:
+        if op == "in":
+            value = list(value)
+            conditions.append(f"{_sql_name(col)} IN ({', '.join('?' * len(value)) or 'NULL'})")
+            params += value
+        else:
+            conditions.append(f"{_sql_name(col)} {'=' if op == '==' else op} ?")
+            params.append(value)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    if query["group_by"]:
+        keys = [_sql_name(key) for key in query["group_by"]]
+        aggregates = [f"{'avg' if func == 'mean' else func}({_sql_name(col)}) AS {_sql_name(name)}"
+                      for name, (col, func) in query["aggregate"].items()]
+        select = ", ".join(keys + aggregates)
+        group = f" GROUP BY {', '.join(keys)}"
+        tiebreak = keys
+    else:
+        select = ", ".join(_sql_name(col) for col in query["columns"]) if query["columns"] else "* EXCLUDE (__row)"
+        group = ""
+        tiebreak = ["__row"]
+    order = [f"{_sql_name(col)} {'ASC' if asc else 'DESC'} NULLS LAST" for col, asc in query["order_by"]]
+    sql = f"SELECT {select} FROM {table}{where}{group} ORDER BY {', '.join(order + tiebreak)}"
+    if query["limit"] is not None:
+        sql += f" LIMIT {int(query['limit'])}"
+    try:
+        return con.execute(sql, params).df()
+    finally:
+        if not isinstance(source, str):
+            con.unregister("source_frame")
+
+
+# Instrumentation. Pages call begin_page() at the top and end_page() at the
+# bottom, and wrap their hot paths in `with stage("name"):` (or decorate a
+# function with @stage("name")). Each stage records wall time, CPU time of the
+# script thread and the memory delta (traced bytes while a profile is being
+# sampled, resident set size otherwise). Records are logged as JSON lines on
+# the "app.stages" logger, totals are written in Prometheus text format to
+# APP_METRICS_FILE if set, and the last rerun is shown in a sidebar panel when
+# APP_DEBUG_PANEL=1 or the URL has ?debug=1.
+
+STAGE_LOGGER = logging.getLogger("app.stages")
+METRICS_FILE = os.environ.get("APP_METRICS_FILE")
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+def _page_run():
+    # The current rerun's record, or None outside a Streamlit script run
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return None
+    return st.session_state.get("_page_run")
+
+def _memory_bytes():
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[0], "traced"
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE"), "rss"
+    except OSError:
+        return None, None
+
+
+class stage(contextlib.ContextDecorator):
+    """Time a named stage of the current page rerun."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def _recreate_cm(self):
+        # A fresh instance per call, so decorated functions can nest or recurse
+        return type(self)(self.name)
+
+    def __enter__(self):
+        self._memory, self._memory_source = _memory_bytes()
+        self._cpu = time.thread_time()
+        self._wall = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self._wall
+        cpu = time.thread_time() - self._cpu
+        memory, source = _memory_bytes()
+        run = _page_run()
+        record = {
+            "page": run["page"] if run else None,
+            "stage": self.name,
+            "wall_s": round(wall, 6),
+            "cpu_s": round(cpu, 6),
+            "mem_delta_bytes": memory - self._memory if source and source == self._memory_source else None,
+            "mem_source": source,
+        }
+        if run is not None:
+            run["records"].append(record)
+        STAGE_LOGGER.info(json.dumps(record))
+        with _metrics_lock:
+            totals = _metrics.setdefault((record["page"], self.name), [0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += wall
+            totals[2] += cpu
+        return False
+
+
+def _request_profile():
+    st.session_state["_profile_next_rerun"] = True
+
+# The run being profiled, if any. tracemalloc is process-wide, so one run is
+# profiled at a time, and begin_page() ends a profile that a run which raised,
+# or was stopped or rerun, left running before end_page().
+_profiled_run = None
+_profile_lock = threading.Lock()
+
+def begin_page(page):
+    # Start the rerun's stage record; profiles this rerun if the debug panel asked for it
+    global _profiled_run
+    run = {"page": page, "records": [], "profiler": None}
+    with _profile_lock:
+        if _profiled_run is not None:
+            _stop_profile(_profiled_run, report=False)
+            _profiled_run = None
+        if st.session_state.pop("_profile_next_rerun", False):
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                run["tracemalloc"] = tracemalloc.take_snapshot()
+            run["profiler"] = cProfile.Profile()
+            run["profiler"].enable()
+            _profiled_run = run
+    st.session_state["_page_run"] = run
+
+def _stop_profile(run, report=True):
+    # Stop sampling; returns the tracemalloc diff if traced and asked for
+    run["profiler"].disable()
+    if "tracemalloc" not in run:
+        return None
+    diff = tracemalloc.take_snapshot().compare_to(run["tracemalloc"], "lineno") if report else None
+    tracemalloc.stop()
+    return diff
+
+def _finish_profile(run):
+    global _profiled_run
+    with _profile_lock:
+        if _profiled_run is not run:
+            # Already ended by a later begin_page()
+            return
+        _profiled_run = None
+        # Snapshot before formatting the profile, which allocates too
+        diff = _stop_profile(run)
+    profile = {}
+    if diff is not None:
+        profile["tracemalloc"] = "\n".join(str(line) for line in diff[:20])
+    out = io.StringIO()
+    pstats.Stats(run["profiler"], stream=out).sort_stats("cumulative").print_stats(30)
+    profile["cprofile"] = out.getvalue()
+    st.session_state["_last_profile"] = profile
+
+def write_metrics(path=METRICS_FILE):
+    # Stage totals since process start in Prometheus text exposition format
+    with _metrics_lock:
+        totals = sorted(_metrics.items(), key=lambda item: (str(item[0][0]), item[0][1]))
+    lines = [
+        "# HELP app_stage_wall_seconds Wall time spent in page stages.",
+        "# TYPE app_stage_wall_seconds summary",
+    ]
+    for (page, name), (count, wall, _) in totals:
+        labels = f'page="{page or ""}",stage="{name}"'
+        lines.append(f"app_stage_wall_seconds_sum{{{labels}}} {wall:.6f}")
+        lines.append(f"app_stage_wall_seconds_count{{{labels}}} {count}")
+    lines += [
+        "# HELP app_stage_cpu_seconds CPU time of the script thread in page stages.",
+        "# TYPE app_stage_cpu_seconds counter",
+    ]
+    for (page, name), (_, _, cpu) in totals:
+        lines.append(f'app_stage_cpu_seconds_total{{page="{page or ""}",stage="{name}"}} {cpu:.6f}')
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp, path)
+
+def debug_panel_enabled():
+    return os.environ.get("APP_DEBUG_PANEL") == "1" or st.query_params.get("debug") == "1"
+
+def end_page():
+    # Finish the rerun: stop a sampled profile, export metrics, show the debug panel
+    run = st.session_state.get("_page_run")
+    if run is None:
+        return
+    if run["profiler"] is not None:
+        _finish_profile(run)
+    if METRICS_FILE:
+        write_metrics(METRICS_FILE)
+    if not debug_panel_enabled():
+        return
+    with st.sidebar.expander("⏱️ Stage timings"):
+        if run["records"]:
+            st.dataframe(pd.DataFrame(run["records"]).drop(columns="page"), hide_index=True)
+        st.button("Profile a rerun", on_click=_request_profile,
+                  help="Rerun this page under cProfile and tracemalloc")
+        profile = st.session_state.get("_last_profile")
+        if profile:
+            st.markdown("**cProfile (cumulative)**")
+            st.code(profile["cprofile"], language=None)
+            if "tracemalloc" in profile:
+                st.markdown("**tracemalloc (top allocations)**")
+                st.code(profile["tracemalloc"], language=None)
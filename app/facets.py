@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from app.core import load_dataset
+from app.skill_matrix import demand_version, load_skill_demand
+
+class FacetIndex:
+    """Filter engine over categorical facets plus one numeric range column.
+
+    Each facet is stored as categorical codes with a packed bitmap per value,
+    and the range column as a sorted index. A filter is then the OR of the
+    selected values' bitmaps per facet, ANDed across facets and with the
+    bitmap of the range lookup. An empty selection means "any non-null
+    value", matching an isin() over all the facet's values.
+    """
+
+    def __init__(self, df, facets, range_column):
+        self.size = len(df)
+        self.values = {}
+        self._ids = {}
+        self._codes = {}
+        self._bitmaps = {}
+        self._any = {}
+        for col in facets:
+            codes, uniques = pd.factorize(df[col], sort=True)
+            self.values[col] = uniques.tolist()
+            self._ids[col] = {value: i for i, value in enumerate(self.values[col])}
+            self._codes[col] = codes
+            self._bitmaps[col] = [np.packbits(codes == i) for i in range(len(uniques))]
+            self._any[col] = np.packbits(codes >= 0)
+
+        values = df[range_column].to_numpy(dtype=float)
+        valid = np.flatnonzero(~np.isnan(values))
+        self._range_order = valid[np.argsort(values[valid], kind='stable')]
+        self._range_values = values[self._range_order]
+
+    def range_bounds(self):
+        if len(self._range_values) == 0:
+            return (np.nan, np.nan)
+        return (float(self._range_values[0]), float(self._range_values[-1]))
+
+    def _facet_bits(self, col, selected):
+        if not selected:
+            return self._any[col]
+        bits = np.zeros_like(self._any[col])
+        for value in selected:
+            if value in self._ids[col]:
+                bits |= self._bitmaps[col][self._ids[col][value]]
+        return bits
+
+    def _base_bits(self, value_range, mask):
+        # Bitmap of the range lookup and of an optional boolean row mask
+        bits = np.packbits(np.ones(self.size, dtype=bool))
+        if value_range is not None:
+            lo = np.searchsorted(self._range_values, value_range[0], side='left')
+            hi = np.searchsorted(self._range_values, value_range[1], side='right')
+            in_range = np.zeros(self.size, dtype=bool)
+            in_range[self._range_order[lo:hi]] = True
+            bits &= np.packbits(in_range)
+        if mask is not None:
+            bits &= np.packbits(np.asarray(mask, dtype=bool))
+        return bits
+
+    def filter(self, selections, value_range=None, mask=None):
+        # Row positions matching every facet selection, the range and the mask
+        bits = self._base_bits(value_range, mask)
+        for col in self.values:
+            bits &= self._facet_bits(col, selections.get(col))
+        return np.flatnonzero(np.unpackbits(bits, count=self.size))
+
+    def counts(self, selections, value_range=None, mask=None):
+        # Matches per value of each facet under the filters on all other facets,
+        # so the widgets can show how many rows picking a value would give.
+        # One bincount over the facet's codes counts every value at once.
+        base = self._base_bits(value_range, mask)
+        facet_bits = {col: self._facet_bits(col, selections.get(col)) for col in self.values}
+        counts = {}
+        for col in self.values:
+            others = base.copy()
+            for other, bits in facet_bits.items():
+                if other != col:
+                    others &= bits
+            codes = self._codes[col][np.unpackbits(others, count=self.size).view(bool)]
+            per_value = np.bincount(codes[codes >= 0], minlength=len(self.values[col]))
+            counts[col] = dict(zip(self.values[col], per_value.tolist()))
+        return counts
+
+
+COURSE_FACETS = ['partner', 'level', 'certificatetype', 'crediteligibility']
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _cached_course_facets(version):
+    top_courses = load_dataset("courses").iloc[load_skill_demand().top_courses]
+    return FacetIndex(top_courses, COURSE_FACETS, 'rating')
+
+def load_course_facets():
+    # Facets over the courses with an in-demand skill score, in Task2's
+    # score order; rebuilt with the skill demand model
+    return _cached_course_facets(demand_version())
@@ -0,0 +1,278 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+# Threads running background jobs, per process
+JOB_WORKERS = int(os.environ.get("APP_JOB_WORKERS", "4"))
+# Finished jobs kept for pickup, least recently requested evicted first
+KEEP_JOBS = 64
+# Seconds a failed job keeps being reported before a request retries it
+RETRY_SECONDS = 30
+# Seconds between refreshes of a page's progress panel
+POLL_SECONDS = float(os.environ.get("APP_JOB_POLL_SECONDS", "0.5"))
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    """A computation on the job pool, shared by every caller asking for its key.
+
+    The function runs as fn(job, *args, **kwargs) and may call
+    job.report(done, total, partial) to publish progress and partial results
+    (e.g. one elbow point per k). report() is also where a cancelled job
+    stops: it raises JobCancelled, so cancellation takes effect at the next
+    report, not in the middle of a step. A job is queued on the pool by its
+    first watcher (acquire), so one nobody waits on never runs.
+    """
+
+    def __init__(self, key, fn, args=(), kwargs=None, label=None, schedule=None):
+        self.key = key
+        self.label = label
+        self._call = (fn, args, kwargs or {})
+        self._schedule = schedule
+        self.state = "pending"
+        self.done, self.total = 0, None
+        self.partial = []
+        self.started = self.finished_at = None
+        self._value = self._error = None
+        self._watchers = 0
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._finished = threading.Event()
+
+    @property
+    def finished(self):
+        return self._finished.is_set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    @property
+    def fraction(self):
+        return min(self.done / self.total, 1.0) if self.total else 0.0
+
+    def report(self, done, total=None, partial=None):
+        self.done = done
+        if total is not None:
+            self.total = total
+        if partial is not None:
+            self.partial.append(partial)
+        if self._cancel.is_set():
+            raise JobCancelled(self.key)
+
+    def cancel(self):
+        self._cancel.set()
+
+    def acquire(self):
+        with self._lock:
+            self._watchers += 1
+            schedule, self._schedule = self._schedule, None
+        if schedule is not None:
+            schedule(self)
+
+    def release(self):
+        # A job nobody waits on any more is cancelled, unless it already finished
+        with self._lock:
+            self._watchers -= 1
+            if self._watchers <= 0 and not self.finished:
+                self.cancel()
+
+    def _claim(self):
+        # Move a pending job to running; False if someone else already did
+        with self._lock:
+            if self.state != "pending":
+                return False
+            self.state = "running"
+            self.started = time.time()
+            return True
+
+    def _run(self):
+        fn, args, kwargs = self._call
+        try:
+            if self._cancel.is_set():
+                raise JobCancelled(self.key)
+            self._value = fn(self, *args, **kwargs)
+            state = "done"
+        except JobCancelled as exc:
+            self._error, state = exc, "cancelled"
+        except BaseException as exc:
+            self._error, state = exc, "failed"
+        self.state, self.finished_at = state, time.time()
+        self._finished.set()
+
+    def wait(self, timeout=None):
+        # True once the job finished, however it ended
+        return self._finished.wait(timeout)
+
+    def result(self, timeout=None):
+        """Wait for the job and return its value, raising its error if it
+        failed. A job still waiting for a pool thread runs in the caller's
+        thread instead, so blocking callers never queue behind other jobs."""
+        if self._claim():
+            self._run()
+        self.acquire()
+        try:
+            if not self._finished.wait(timeout):
+                raise TimeoutError(self.key)
+        finally:
+            self.release()
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+
+class JobRunner:
+    """Thread pool plus a registry of jobs keyed by a fingerprint of their inputs.
+
+    submit() returns the registered job for a key unless it was cancelled, so
+    the same request from many sessions is computed once. The job starts on a
+    pool thread when the first caller watches it, or in the caller's thread
+    on result(). Finished jobs stay registered for the pages to pick up their
+    results on a later rerun; a failed one is only retried after
+    RETRY_SECONDS, so reruns show its error instead of starting it over and
+    over. Beyond KEEP_JOBS, finished jobs and jobs nobody watched are evicted,
+    least recently requested first.
+    """
+
+    def __init__(self, workers=JOB_WORKERS, keep=KEEP_JOBS):
+        self.keep = keep
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="app-job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, key, fn, *args, label=None, **kwargs):
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and not job.cancelled and not (
+                    job.state == "failed" and time.time() - job.finished_at > RETRY_SECONDS):
+                self._jobs.move_to_end(key)
+                return job
+            job = self._jobs[key] = Job(key, fn, args, kwargs, label,
+                                        schedule=lambda job: self._pool.submit(self._start, job))
+            self._evict()
+        return job
+
+    def resubmit(self, job):
+        # A new job for a cancelled job's key and call
+        fn, args, kwargs = job._call
+        return self.submit(job.key, fn, *args, label=job.label, **kwargs)
+
+    def _start(self, job):
+        if job._claim():
+            job._run()
+
+    def _evict(self):
+        # Finished jobs, and jobs submitted but never watched (a stopped slot,
+        # or inputs that changed before the page watched them), which would
+        # otherwise hold on to their arguments for good. The job just
+        # submitted, last in the registry, is kept.
+        idle = [key for key, job in list(self._jobs.items())[:-1]
+                if job.finished or (job._schedule is not None and job._watchers == 0)]
+        for key in idle[:max(0, len(self._jobs) - self.keep)]:
+            del self._jobs[key]
+
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def running(self):
+        # Started or queued; a job nobody has watched yet is not running
+        return [job for job in self.jobs() if not job.finished and job._schedule is None]
+
+@st.cache_resource(show_spinner=False)
+def job_runner():
+    return JobRunner()
+
+def submit_job(key, fn, *args, label=None, **kwargs):
+    # Keys are tuples of hashable inputs: a name plus data versions, model
+    # versions, content fingerprints and parameters
+    return job_runner().submit(key, fn, *args, label=label, **kwargs)
+
+def run_job(key, fn, *args, label=None, **kwargs):
+    # Blocking counterpart of submit_job: waits for the shared job, or runs it
+    # here if no pool thread has started it yet
+    while True:
+        try:
+            return submit_job(key, fn, *args, label=label, **kwargs).result()
+        except JobCancelled:
+            # The last session watching it moved on between submit and wait;
+            # submit starts a new job for the key
+            continue
+
+
+# Pages
+
+def watch(slot, job):
+    """Make job the one this session waits on in `slot` (e.g. "silhouette").
+
+    The job it replaces is released, and cancelled if no other session or
+    caller is waiting on it: the user changed the inputs mid-run.
+    """
+    watched = st.session_state.setdefault("_jobs", {})
+    previous = watched.get(slot)
+    if previous is not job:
+        job.acquire()
+        watched[slot] = job
+        if previous is not None:
+            previous.release()
+    return job
+
+def stop(slot):
+    # The user cancelled the job in `slot`: stop waiting on it (cancelling it
+    # unless another session still waits) and do not restart it for the same
+    # key until they ask
+    job = st.session_state.setdefault("_jobs", {}).pop(slot, None)
+    if job is not None:
+        st.session_state.setdefault("_stopped_jobs", {})[slot] = job.key
+        job.release()
+
+def job_result(slot, job, partial=None):
+    """The job's value if it has finished, otherwise None.
+
+    While it runs, a progress bar is shown that refreshes every POLL_SECONDS
+    with partial(job.partial) drawn under it and a button that cancels it,
+    and the whole page is rerun once the job finishes, which then picks up
+    the value. The rest of the page keeps working in the meantime. A failed
+    job raises its error. A job cancelled by the user stays stopped, with a
+    button to run it again, until its inputs change.
+    """
+    stopped = st.session_state.setdefault("_stopped_jobs", {})
+    if slot in stopped:
+        if stopped[slot] == job.key:
+            st.info(f"{job.label or 'Job'} cancelled.")
+            if st.button("Run again", key=f"_job_restart:{slot}"):
+                del stopped[slot]
+                st.rerun()
+            return None
+        del stopped[slot]
+    watch(slot, job)
+    # Cancelled because the last session waiting on it moved on before this
+    # one started watching: run it again, as run_job does
+    while job.cancelled:
+        job = watch(slot, job_runner().resubmit(job))
+    if job.finished:
+        return job.result()
+    _progress(slot, job, partial)
+    return None
+
+@st.fragment(run_every=POLL_SECONDS)
+def _progress(slot, job, partial):
+    if job.finished:
+        st.rerun()
+    label = job.label or "Working…"
+    if job.total:
+        label += f" ({job.done} of {job.total})"
+    bar, button = st.columns([5, 1])
+    bar.progress(job.fraction, text=label)
+    if button.button("Cancel", key=f"_job_cancel:{slot}"):
+        stop(slot)
+        st.rerun()
+    if partial is not None and job.partial:
+        partial(list(job.partial))
@@ -0,0 +1,68 @@
+import importlib
+import os
+import threading
+import types
+
+# Imported on first attribute access instead of at page load. Together they
+# cost several seconds on a cold process (seaborn alone pulls in matplotlib
+# and scipy.stats), and most of them are only needed once a chart is drawn
+# or a model is fitted.
+HEAVY_MODULES = [
+    "matplotlib.figure",
+    "seaborn",
+    "sklearn.preprocessing",
+    "sklearn.cluster",
+    "sklearn.decomposition",
+    "sklearn.metrics",
+    "scipy.sparse",
+    "plotly.express",
+    "plotly.graph_objects",
+]
+# Set to 0 to keep heavy imports fully on demand
+PREWARM = os.environ.get("APP_PREWARM_IMPORTS", "1") == "1"
+
+
+class LazyModule(types.ModuleType):
+    """Module proxy that imports the real module on first attribute access.
+
+    Only importlib.import_module is used, so the import lock makes it safe
+    while the pre-warm thread imports the same module.
+    """
+
+    def __init__(self, name):
+        super().__init__(name)
+        self._module = None
+
+    def __getattr__(self, attr):
+        if attr.startswith("__") or attr == "_module":
+            raise AttributeError(attr)
+        if self._module is None:
+            self._module = importlib.import_module(self.__name__)
+        return getattr(self._module, attr)
+
+    def __dir__(self):
+        return dir(importlib.import_module(self.__name__))
+
+def lazy_import(name):
+    return LazyModule(name)
+
+
+_prewarm_started = threading.Event()
+
+def _import_all(modules):
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+
+def prewarm(modules=None):
+    # Import the heavy modules in a daemon thread, once per process, so the
+    # first Task page a user opens finds them in sys.modules
+    if not PREWARM or _prewarm_started.is_set():
+        return None
+    _prewarm_started.set()
+    thread = threading.Thread(target=_import_all, args=(modules or HEAVY_MODULES,),
+                              name="import-prewarm", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,248 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from app.lazy import lazy_import
+from app.skill_matrix import demand_version, load_skill_demand
+
+# Imported by the first matrix built, not when a page imports this module
+sparse = lazy_import("scipy.sparse")
+
+METRICS = ("coverage", "jaccard")
+METHODS = ("auto", "sparse", "minhash")
+# Above this many query x target pairs "auto" switches from the exact sparse
+# product to MinHash LSH candidates
+LSH_MIN_PAIRS = 500_000_000
+# Queries per block, bounding the memory of products and candidate lists,
+# and at most BLOCK_PAIRS query x target pairs per block, which bounds a
+# sparse product even when most pairs share a skill
+BLOCK_ROWS = 4096
+BLOCK_PAIRS = 16_000_000
+# With a small vocabulary most pairs share a skill and the sparse product is
+# effectively dense; up to this many vocabulary x target cells the targets are
+# densified and each block is scored as a dense (block x targets) array of at
+# most DENSE_BLOCK_CELLS cells
+DENSE_MAX_CELLS = 20_000_000
+DENSE_BLOCK_CELLS = 16_000_000
+_PRIME = (1 << 31) - 1
+
+
+def binary_rows(matrix):
+    # Set semantics: duplicate skills in a list count once
+    matrix = sparse.csr_matrix(matrix, copy=True)
+    matrix.sum_duplicates()
+    matrix.data = np.ones_like(matrix.data, dtype=np.float64)
+    return matrix
+
+def _weighted(matrix, weights):
+    matrix = matrix.copy()
+    matrix.data = weights[matrix.indices].astype(np.float64)
+    return matrix
+
+def _top_k(rows, cols, scores, k):
+    # Keep the k best (col, score) per row: highest score first, ties by col
+    order = np.lexsort((cols, -scores, rows))
+    rows, cols, scores = rows[order], cols[order], scores[order]
+    first = np.r_[True, rows[1:] != rows[:-1]]
+    starts = np.maximum.accumulate(np.where(first, np.arange(len(rows)), 0))
+    rank = np.arange(len(rows)) - starts
+    keep = (rank < k) & (scores > 0)
+    return rows[keep], cols[keep], scores[keep], rank[keep]
+
+def _dense_top_k(scores, k):
+    # _top_k over a dense (rows x cols) score array: only entries reaching each
+    # row's k-th best score (ties included) go through the sort
+    if scores.shape[1] > k:
+        kth = np.partition(scores, scores.shape[1] - k, axis=1)[:, -k]
+    else:
+        kth = scores.min(axis=1)
+    rows, cols = np.nonzero((scores >= kth[:, None]) & (scores > 0))
+    return _top_k(rows, cols, scores[rows, cols], k)
+
+
+class MinHashLSH:
+    """MinHash signatures of sparse set rows and LSH banding over them.
+
+    Row i's signature holds, for each of num_perm hash functions, the minimum
+    hash over its column ids. Two rows agree on one signature entry with
+    probability equal to their Jaccard similarity, so rows that agree on all
+    entries of at least one band (bands x rows_per_band = num_perm) become
+    candidates. More bands of fewer rows raise recall and the candidate count.
+    """
+
+    def __init__(self, n_columns, num_perm=128, bands=32, seed=0):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm, self.bands, self.rows_per_band = num_perm, bands, num_perm // bands
+        rng = np.random.default_rng(seed)
+        a = rng.integers(1, _PRIME, num_perm, dtype=np.uint64)
+        b = rng.integers(0, _PRIME, num_perm, dtype=np.uint64)
+        # Hash of every column under every permutation, looked up per set entry
+        self._column_hashes = ((a * np.arange(n_columns, dtype=np.uint64)[:, None] + b) % _PRIME).astype(np.uint32)
+        self._band_mix = rng.integers(1, 2 ** 63, self.rows_per_band, dtype=np.uint64) | np.uint64(1)
+
+    def signatures(self, matrix):
+        # (rows x num_perm) uint32 minimum hashes; empty rows stay at the maximum
+        signatures = np.full((matrix.shape[0], self.num_perm), np.iinfo(np.uint32).max, dtype=np.uint32)
+        for start in range(0, matrix.shape[0], BLOCK_ROWS):
+            block = matrix[start:start + BLOCK_ROWS]
+            nonempty = np.flatnonzero(np.diff(block.indptr))
+            if len(nonempty):
+                hashed = self._column_hashes[block.indices]
+                signatures[start + nonempty] = np.minimum.reduceat(hashed, block.indptr[nonempty], axis=0)
+        return signatures
+
+    def band_keys(self, signatures):
+        # (rows x bands) uint64 keys, one per band of the signature
+        bands = signatures.reshape(len(signatures), self.bands, self.rows_per_band).astype(np.uint64)
+        return (bands * self._band_mix).sum(axis=2)
+
+    @staticmethod
+    def candidates(query_keys, target_keys, target_valid):
+        # (query, target) pairs sharing a key in at least one band
+        pairs = []
+        targets = np.flatnonzero(target_valid)
+        for band in range(query_keys.shape[1]):
+            order = targets[np.argsort(target_keys[targets, band], kind='stable')]
+            sorted_keys = target_keys[order, band]
+            lo = np.searchsorted(sorted_keys, query_keys[:, band], side='left')
+            hi = np.searchsorted(sorted_keys, query_keys[:, band], side='right')
+            counts = hi - lo
+            if not counts.any():
+                continue
+            queries = np.repeat(np.arange(len(query_keys)), counts)
+            offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            pairs.append(queries.astype(np.int64) * len(target_keys) + order[np.repeat(lo, counts) + offsets])
+        if not pairs:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        unique = np.unique(np.concatenate(pairs))
+        return unique // len(target_keys), unique % len(target_keys)
+
+
+class SkillMatcher:
+    """Top-k matching between job postings and courses by skill overlap.
+
+    coverage: weighted share of the job's skills that the course teaches
+    jaccard:  shared skills over the union of both skill sets
+
+    The "sparse" method is exact: one product per block of queries yields
+    every intersection, kept sparse so pairs without a shared skill are never
+    touched, or dense when the targets fit DENSE_MAX_CELLS. "minhash" scores
+    only LSH candidate pairs, trading recall (set by num_perm and bands) for
+    time on very large inputs; its candidates follow Jaccard similarity, so
+    "auto" picks it for that metric only.
+    """
+
+    def __init__(self, courses, jobs, weights=None):
+        self.courses = binary_rows(courses)
+        self.jobs = binary_rows(jobs)
+        self.weights = np.ones(self.courses.shape[1]) if weights is None else np.asarray(weights, dtype=float)
+        self._lsh = {}
+        self._dense = {}
+
+    def courses_for_jobs(self, jobs=None, k=10, **params):
+        # DataFrame of (job, course, score, rank) for the given job positions (default: all)
+        result = self._match(self.jobs, self.courses, jobs, k, query_is_job=True, **params)
+        return result.rename(columns={"query": "job", "target": "course"})
+
+    def courses_for_profiles(self, profiles, k=10, **params):
+        # Top-k courses for ad hoc skill rows over the course vocabulary (e.g.
+        # a learner's target skills), scored as if each row were a job posting
+        result = self._match(binary_rows(profiles), self.courses, None, k, query_is_job=True, **params)
+        return result.rename(columns={"query": "profile", "target": "course"})
+
+    def jobs_for_courses(self, courses=None, k=10, **params):
+        result = self._match(self.courses, self.jobs, courses, k, query_is_job=False, **params)
+        return result.rename(columns={"query": "course", "target": "job"})
+
+    def _match(self, queries, targets, positions, k, query_is_job, metric="coverage", method="auto",
+               num_perm=128, bands=64):
+        if metric not in METRICS:
+            raise ValueError(f"unknown metric {metric!r}, expected one of {METRICS}")
+        if method not in METHODS:
+            raise ValueError(f"unknown method {method!r}, expected one of {METHODS}")
+        positions = np.arange(queries.shape[0]) if positions is None else np.asarray(positions, dtype=np.int64)
+        queries = queries[positions]
+        if method == "auto":
+            # MinHash estimates Jaccard; for coverage its candidates miss too much
+            large = queries.shape[0] * targets.shape[0] >= LSH_MIN_PAIRS
+            method = "minhash" if metric == "jaccard" and large else "sparse"
+
+        # Coverage is always measured against the job's skills
+        jobs_side = queries if query_is_job else targets
+        if metric == "coverage":
+            job_weight = np.asarray(_weighted(jobs_side, self.weights).sum(axis=1)).ravel()
+        query_size = np.asarray(queries.sum(axis=1)).ravel()
+        target_size = np.asarray(targets.sum(axis=1)).ravel()
+        weighted_queries = _weighted(queries, self.weights) if metric == "coverage" else queries
+
+        def score(q, t, shared):
+            if metric == "jaccard":
+                union = query_size[q] + target_size[t] - shared
+                return np.divide(shared, union, out=np.zeros_like(shared), where=union > 0)
+            denominator = job_weight[q] if query_is_job else job_weight[t]
+            return np.divide(shared, denominator, out=np.zeros_like(shared), where=denominator > 0)
+
+        dense_targets = None
+        block_rows = max(1, min(BLOCK_ROWS, BLOCK_PAIRS // max(targets.shape[0], 1)))
+        if method == "minhash":
+            lsh = self._lsh_for(num_perm, bands)
+            target_keys = lsh.band_keys(lsh.signatures(targets))
+            target_valid = target_size > 0
+        elif targets.shape[0] * targets.shape[1] <= DENSE_MAX_CELLS:
+            dense_targets = self._dense_targets(query_is_job)
+            block_rows = max(1, DENSE_BLOCK_CELLS // max(targets.shape[0], 1))
+
+        parts = []
+        for start in range(0, queries.shape[0], block_rows):
+            stop = min(start + block_rows, queries.shape[0])
+            if dense_targets is not None:
+                # Scores broadcast over (block x targets)
+                q, t = np.arange(start, stop)[:, None], np.arange(targets.shape[0])[None, :]
+                rows, cols, scores, rank = _dense_top_k(score(q, t, weighted_queries[start:stop] @ dense_targets), k)
+                rows += start
+            else:
+                if method == "sparse":
+                    shared = (weighted_queries[start:stop] @ targets.T).tocoo()
+                    q, t, values = shared.row.astype(np.int64) + start, shared.col.astype(np.int64), shared.data
+                else:
+                    block = queries[start:stop]
+                    q, t = lsh.candidates(lsh.band_keys(lsh.signatures(block)), target_keys, target_valid)
+                    q += start
+                    values = np.asarray(weighted_queries[q].multiply(targets[t]).sum(axis=1)).ravel()
+                rows, cols, scores, rank = _top_k(q, t, score(q, t, values), k)
+            parts.append(pd.DataFrame({"query": positions[rows], "target": cols, "score": scores, "rank": rank}))
+        if not parts:
+            return pd.DataFrame({"query": [], "target": [], "score": [], "rank": []})
+        return pd.concat(parts, ignore_index=True)
+
+    def _dense_targets(self, query_is_job):
+        # Transposed dense course (or job) matrix, kept for repeated small queries
+        key = "courses" if query_is_job else "jobs"
+        if key not in self._dense:
+            self._dense[key] = (self.courses if query_is_job else self.jobs).T.toarray()
+        return self._dense[key]
+
+    def _lsh_for(self, num_perm, bands):
+        if (num_perm, bands) not in self._lsh:
+            self._lsh[(num_perm, bands)] = MinHashLSH(self.courses.shape[1], num_perm, bands)
+        return self._lsh[(num_perm, bands)]
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _cached_matcher(version):
+    demand = load_skill_demand()
+    return SkillMatcher(demand.courses, demand.jobs)
+
+def load_matcher():
+    # Built from the skill demand model's matrices, once per dataset version
+    return _cached_matcher(demand_version())
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def _cached_job_matches(version, k, params):
+    return load_matcher().courses_for_jobs(k=k, **dict(params))
+
+def match_all_jobs(k=10, **params):
+    """Batch mode: the top-k courses of every job, computed once per dataset
+    version and parameters (metric, method, num_perm, bands)."""
+    return _cached_job_matches(demand_version(), k, tuple(sorted(params.items())))
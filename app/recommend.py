@@ -0,0 +1,115 @@
+import numpy as np
+import streamlit as st
+
+from app.core import dataset_version, load_dataset
+from app.matching import METRICS, load_matcher
+from app.skill_index import load_skill_index
+from app.skill_matrix import demand_version, load_skill_demand
+
+# Upper bound on k per request, which bounds the size of a response
+MAX_K = 100
+
+
+def _check_k(k):
+    if isinstance(k, bool) or not isinstance(k, int) or not 1 <= k <= MAX_K:
+        raise ValueError(f"k must be an integer from 1 to {MAX_K}")
+    return k
+
+def _check_strings(values, what):
+    if not isinstance(values, (list, tuple)) or not all(isinstance(value, str) for value in values):
+        raise ValueError(f"{what} must be a list of strings")
+    return list(values)
+
+def _records(courses, positions, scores=None):
+    # One dict per course position, in the given order
+    positions = np.asarray(positions, dtype=np.int64)
+    fields = {
+        "course": courses["course"][positions].tolist(),
+        "partner": courses["partner"][positions].tolist(),
+        "rating": [None if rating != rating else rating for rating in courses["rating"][positions].tolist()],
+    }
+    if scores is not None:
+        fields["score"] = np.round(scores, 6).tolist()
+    return [dict(zip(fields, values)) for values in zip(*fields.values())]
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _cached_columns(name, version):
+    df = load_dataset(name)
+    return {"course": df["course"].astype(str).to_numpy(), "partner": df["partner"].astype(str).to_numpy(),
+            "rating": df["rating"].to_numpy(dtype=float)}
+
+def _columns(name):
+    # Plain arrays of the fields a record carries, per dataset version; indexing
+    # them is much cheaper than .iloc on the frame for many inputs
+    return _cached_columns(name, dataset_version(name))
+
+
+class Recommender:
+    """Course recommendations without the Streamlit pages.
+
+    for_goals is Task1's goal search, for_profiles matches skill lists to
+    courses like Task2's job matching, and in_demand is Task2's in-demand
+    ranking. Each batch method takes many inputs and returns one list of
+    course records per input. Datasets, the skill index and the skill
+    matrices come from the app's per-version caches, so a long-lived
+    process loads them once and picks up new data versions by itself.
+    """
+
+    def __init__(self):
+        self._loaded = (None, None)
+
+    def _resources(self):
+        # Everything a request reads, for the current dataset versions. Held
+        # on the instance so a warm process does not pay the cache lookups
+        # (which hash their arguments) on every request.
+        version = demand_version()
+        if self._loaded[0] != version:
+            self._loaded = (version, {
+                "index": load_skill_index(), "catalog": _columns("course_catalog"),
+                "demand": load_skill_demand(), "matcher": load_matcher(), "courses": _columns("courses"),
+            })
+        return self._loaded[1]
+
+    def warm(self):
+        # Load every dataset and index up front, e.g. before serving requests
+        self._resources()
+        return self
+
+    def for_goals(self, goals, k=10):
+        goals, k = _check_strings(goals, "goals"), _check_k(k)
+        resources = self._resources()
+        index, courses = resources["index"], resources["catalog"]
+        # Repeated goals (common in large batches) are searched once
+        found = {}
+        results = []
+        for goal in goals:
+            key = goal.strip().lower()
+            if key not in found:
+                found[key] = _records(courses, index.search(key, k=k)) if key else []
+            results.append(found[key])
+        return results
+
+    def for_profiles(self, profiles, k=10, metric="coverage"):
+        # Skills are matched case-insensitively; unknown skills are ignored
+        if not isinstance(profiles, (list, tuple)):
+            raise ValueError("profiles must be a list of skill lists")
+        profiles = [[skill.strip().lower() for skill in _check_strings(profile, "each profile")]
+                    for profile in profiles]
+        k = _check_k(k)
+        if metric not in METRICS:
+            raise ValueError(f"metric must be one of {METRICS}")
+        resources = self._resources()
+        matches = resources["matcher"].courses_for_profiles(resources["demand"].profile_matrix(profiles),
+                                                            k=k, metric=metric)
+        # Matches come grouped by profile, best first
+        profile = matches["profile"].to_numpy(dtype=np.int64)
+        bounds = np.searchsorted(profile, np.arange(len(profiles) + 1))
+        records = _records(resources["courses"], matches["course"].to_numpy(), matches["score"].to_numpy())
+        return [records[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+    def in_demand(self, k=10):
+        # The courses whose skills are most requested by job postings
+        resources = self._resources()
+        demand = resources["demand"]
+        top = demand.top_courses[:_check_k(k)]
+        return _records(resources["courses"], top, demand.course_scores[top])
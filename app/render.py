@@ -0,0 +1,213 @@
+import hashlib
+import io
+import os
+import threading
+import types
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from app.core import stage
+from app.jobs import job_result, submit_job
+
+# Rendered images kept per process, least recently used evicted first
+RENDER_CACHE_BYTES = int(os.environ.get("RENDER_CACHE_MB", "64")) * 2 ** 20
+# Same output st.pyplot produces
+SAVEFIG_KWARGS = {"format": "png", "dpi": 200, "bbox_inches": "tight"}
+# Above LARGE_PLOT_ROWS rows, charts switch to large-data mode: binned
+# aggregates, or a stratified sample of about PLOT_SAMPLE_ROWS points
+LARGE_PLOT_ROWS = int(os.environ.get("LARGE_PLOT_ROWS", "50000"))
+PLOT_SAMPLE_ROWS = int(os.environ.get("PLOT_SAMPLE_ROWS", "10000"))
+
+
+class RenderCache:
+    """Thread-safe LRU of rendered image bytes under a total size budget."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+            return data
+
+    def put(self, key, data):
+        with self._lock:
+            if key in self._items:
+                self.size -= len(self._items.pop(key))
+            self._items[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes and len(self._items) > 1:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= len(evicted)
+
+@st.cache_resource(show_spinner=False)
+def render_cache():
+    return RenderCache(RENDER_CACHE_BYTES)
+
+
+def fingerprint(*parts):
+    # Content hash of frames, arrays and plain parameters
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, pd.Series):
+            part = part.to_frame()
+        if isinstance(part, pd.DataFrame):
+            digest.update(repr((list(part.columns), [str(dtype) for dtype in part.dtypes])).encode())
+            try:
+                hashed = pd.util.hash_pandas_object(part, index=True)
+            except TypeError:
+                # Unhashable cells (lists): hash their text instead
+                hashed = pd.util.hash_pandas_object(part.astype(str), index=True)
+            digest.update(hashed.to_numpy().tobytes())
+        elif isinstance(part, np.ndarray):
+            part = np.ascontiguousarray(part)
+            digest.update(repr((part.shape, part.dtype.str)).encode())
+            digest.update(part.data)
+        else:
+            digest.update(repr(part).encode())
+    return digest.hexdigest()
+
+def _code_key(code):
+    # Bytecode and constants, recursing into nested code objects whose repr
+    # would otherwise carry a per-run memory address
+    consts = tuple(_code_key(c) if hasattr(c, "co_code") else repr(c) for c in code.co_consts)
+    return (code.co_code, consts, code.co_names)
+
+def _draw_key(draw):
+    # Identify the drawing function by name and code, so editing it invalidates
+    return (draw.__module__, draw.__qualname__, _code_key(draw.__code__))
+
+def _global_names(code):
+    # Names the code and the code objects nested in it look up outside
+    # their locals (attribute names too, which at worst add to the key)
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if hasattr(const, "co_code"):
+            names |= _global_names(const)
+    return names
+
+def _is_data(value):
+    # Modules, functions and classes are keyed by their code or do not change
+    return not isinstance(value, (types.ModuleType, types.FunctionType, types.BuiltinFunctionType, type))
+
+def _free_values(draw):
+    # Data the drawing function reads besides its arguments, as fingerprint
+    # parts: closure cells and module globals (a page's draw functions are
+    # defined at module level, so e.g. Task1's valid_levels is a global)
+    values = []
+    for i, cell in enumerate(draw.__closure__ or ()):
+        try:
+            value = cell.cell_contents
+        except ValueError:
+            continue
+        if _is_data(value):
+            values += [draw.__code__.co_freevars[i], value]
+    for name in sorted(_global_names(draw.__code__)):
+        if name in draw.__globals__ and _is_data(draw.__globals__[name]):
+            values += [name, draw.__globals__[name]]
+    return values
+
+def render_key(draw, *parts):
+    # Cache key of an image drawn by draw from parts
+    return fingerprint(_draw_key(draw), *_free_values(draw), *parts)
+
+
+def figure_png(draw, *data, figsize=None, **params):
+    """PNG bytes of draw(ax, *data, **params) on a fresh Figure.
+
+    Rendered once per fingerprint of the data, the parameters and the drawing
+    function, then served from the render cache. Uses an explicit Figure, not
+    pyplot, so concurrent sessions never share figure state.
+    """
+    key = render_key(draw, figsize, params, *data)
+    cache = render_cache()
+    png = cache.get(key)
+    if png is None:
+        # matplotlib is imported on the first cache miss, not at page load
+        from matplotlib.figure import Figure
+        fig = Figure(figsize=figsize)
+        draw(fig.subplots(), *data, **params)
+        buf = io.BytesIO()
+        fig.savefig(buf, **SAVEFIG_KWARGS)
+        png = buf.getvalue()
+        cache.put(key, png)
+    return png
+
+_PYPLOT_LOCK = threading.Lock()
+
+def grid_png(draw, *data, key=None, **params):
+    # Same as figure_png for figure-level seaborn functions (pairplot, ...) that
+    # create their own pyplot figure: draw returns the grid or figure, which is
+    # rendered under a lock and closed straight away
+    key = key or render_key(draw, params, *data)
+    cache = render_cache()
+    png = cache.get(key)
+    if png is None:
+        import matplotlib.pyplot as plt
+        from matplotlib.figure import Figure
+        with _PYPLOT_LOCK:
+            result = draw(*data, **params)
+            fig = result if isinstance(result, Figure) else result.figure
+            try:
+                buf = io.BytesIO()
+                fig.savefig(buf, **SAVEFIG_KWARGS)
+            finally:
+                plt.close(fig)
+        png = buf.getvalue()
+        cache.put(key, png)
+    return png
+
+def show_figure(draw, *data, figsize=None, **params):
+    with stage(f"render:{draw.__name__}"):
+        st.image(figure_png(draw, *data, figsize=figsize, **params))
+
+def _grid_job(job, draw, data, key, params):
+    return grid_png(draw, *data, key=key, **params)
+
+def show_grid(draw, *data, background=False, **params):
+    # With background=True a grid missing from the render cache is rendered
+    # as a shared job, with a progress bar shown in its place until then
+    with stage(f"render:{draw.__name__}"):
+        if not background:
+            st.image(grid_png(draw, *data, **params))
+            return
+        key = render_key(draw, params, *data)
+        png = render_cache().get(key)
+        if png is None:
+            job = submit_job(("render", key), _grid_job, draw, data, key, params,
+                             label=f"Drawing {draw.__name__.removeprefix('draw_')}")
+            png = job_result(f"render:{draw.__name__}", job)
+        if png is not None:
+            st.image(png)
+
+
+# Large-data mode
+
+def is_large(df):
+    return len(df) > LARGE_PLOT_ROWS
+
+def stratified_sample(df, by, n=None, random_state=42):
+    # About n rows drawn from every group of `by` in proportion to its size,
+    # in original row order; small frames are returned as is
+    n = n or PLOT_SAMPLE_ROWS
+    if len(df) <= n:
+        return df
+    sample = df.groupby(by, group_keys=False, observed=True).sample(frac=n / len(df), random_state=random_state)
+    return sample.sort_index()
+
+def plot_rows(df, by):
+    # Rows to plot plus a note on the active mode for the user (None when all rows are drawn)
+    if not is_large(df):
+        return df, None
+    sample = stratified_sample(df, by)
+    note = (f"Large-data mode: showing {len(sample):,} of {len(df):,} rows, "
+            f"sampled in proportion to each {by}.")
+    return sample, note
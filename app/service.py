@@ -0,0 +1,142 @@
+import asyncio
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from app.recommend import Recommender
+
+LOGGER = logging.getLogger("app.service")
+# Limits per request
+MAX_BODY_BYTES = 8 * 2 ** 20
+MAX_INPUTS = 10000
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class RecommendationService:
+    """Minimal asyncio HTTP/1.1 JSON service over a Recommender.
+
+    GET  /health               {"status": "ok"}
+    GET  /in-demand?k=10       {"courses": [...]}
+    POST /recommend            {"goals": [...], "profiles": [[skill, ...], ...], "k": 10, "metric": "coverage"}
+                               -> {"goals": [[course, ...], ...], "profiles": [[course, ...], ...]}
+
+    Connections are kept alive. Requests are parsed on the event loop and
+    scored on a small thread pool, so slow batches do not stall other
+    connections; the recommender's datasets and indexes are loaded by
+    start() and stay warm for the life of the process.
+    """
+
+    def __init__(self, recommender=None, workers=None):
+        self.recommender = recommender or Recommender()
+        self.executor = ThreadPoolExecutor(max_workers=workers or min(4, os.cpu_count() or 1),
+                                           thread_name_prefix="recommend")
+
+    async def start(self, host="127.0.0.1", port=8765):
+        await asyncio.get_running_loop().run_in_executor(self.executor, self.recommender.warm)
+        return await asyncio.start_server(self._connection, host, port)
+
+    async def _connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                keep_alive = await self._respond(request_line, reader, writer)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, request_line, reader, writer):
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            method, target, version = request_line.decode("latin-1").split()
+        except ValueError:
+            self._write(writer, 400, {"error": "malformed request line"}, keep_alive=False)
+            return False
+        keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+
+        try:
+            length = int(headers.get("content-length", 0))
+            if length > MAX_BODY_BYTES:
+                raise HTTPError(413, f"body larger than {MAX_BODY_BYTES} bytes")
+            body = await reader.readexactly(length) if length else b""
+            status, payload = 200, await self._dispatch(method, urlsplit(target), body)
+        except HTTPError as exc:
+            status, payload = exc.status, {"error": str(exc)}
+            keep_alive = keep_alive and exc.status != 413
+        except ValueError as exc:
+            status, payload = 400, {"error": str(exc)}
+        except Exception:
+            LOGGER.exception("request failed: %s %s", method, target)
+            status, payload = 500, {"error": "internal error"}
+        self._write(writer, status, payload, keep_alive)
+        return keep_alive
+
+    async def _dispatch(self, method, url, body):
+        routes = {"/health": "GET", "/in-demand": "GET", "/recommend": "POST"}
+        if url.path not in routes:
+            raise HTTPError(404, f"no route {url.path}")
+        if method != routes[url.path]:
+            raise HTTPError(405, f"{url.path} expects {routes[url.path]}")
+        if url.path == "/health":
+            return {"status": "ok"}
+
+        loop = asyncio.get_running_loop()
+        if url.path == "/in-demand":
+            k = int(parse_qs(url.query).get("k", ["10"])[0])
+            return {"courses": await loop.run_in_executor(self.executor, self.recommender.in_demand, k)}
+        request = json.loads(body or b"{}")
+        if not isinstance(request, dict):
+            raise ValueError("request body must be a JSON object")
+        return await loop.run_in_executor(self.executor, self._recommend, request)
+
+    def _recommend(self, request):
+        goals, profiles = request.get("goals") or [], request.get("profiles") or []
+        if not isinstance(goals, list) or not isinstance(profiles, list):
+            raise ValueError("goals and profiles must be JSON arrays")
+        if len(goals) + len(profiles) > MAX_INPUTS:
+            raise ValueError(f"at most {MAX_INPUTS} goals and profiles per request")
+        k = request.get("k", 10)
+        response = {}
+        if goals:
+            response["goals"] = self.recommender.for_goals(goals, k=k)
+        if profiles:
+            response["profiles"] = self.recommender.for_profiles(profiles, k=k,
+                                                                 metric=request.get("metric", "coverage"))
+        return response
+
+    @staticmethod
+    def _write(writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode()
+        head = (f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+
+
+async def serve(host="127.0.0.1", port=8765, workers=None):
+    server = await RecommendationService(workers=workers).start(host, port)
+    for sock in server.sockets:
+        LOGGER.info("serving recommendations on http://%s:%s", *sock.getsockname()[:2])
+    async with server:
+        await server.serve_forever()
@@ -0,0 +1,84 @@
+import bisect
+import heapq
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from app.core import dataset_version, load_dataset
+
+
+class SkillIndex:
+    """Inverted index from skill to the courses that teach it.
+
+    A goal matches a skill when either string contains the other
+    (case-insensitive), the same rule Task1 used to apply row by row. Skills
+    containing the goal come from a sorted array of every suffix of every
+    skill; skills contained in the goal are looked up for each substring of
+    the goal. Postings hold course ranks by rating (best first), so the top-k
+    courses are the k smallest ranks across the matched postings.
+    """
+
+    def __init__(self, skills_lists, ratings):
+        ratings = np.asarray(ratings, dtype=float)
+        # Rank 0 is the best-rated course; ties keep row order, NaN goes last
+        self.order = np.argsort(-ratings, kind='stable')
+        rank = np.empty(len(self.order), dtype=np.int64)
+        rank[self.order] = np.arange(len(self.order))
+
+        exploded = pd.Series(list(skills_lists), dtype=object).explode().dropna()
+        codes, vocabulary = pd.factorize(exploded.astype(str).str.lower(), sort=True)
+        ranks = rank[exploded.index.to_numpy()]
+        by_skill = np.lexsort((ranks, codes))
+        codes, ranks = codes[by_skill], ranks[by_skill]
+        bounds = np.searchsorted(codes, np.arange(len(vocabulary) + 1))
+
+        self.vocabulary = list(vocabulary)
+        self.postings = [ranks[bounds[i]:bounds[i + 1]] for i in range(len(vocabulary))]
+        self._skill_ids = {skill: i for i, skill in enumerate(self.vocabulary)}
+        self._max_len = max(map(len, self.vocabulary), default=0)
+        suffixes = sorted((skill[start:], i) for i, skill in enumerate(self.vocabulary)
+                          for start in range(len(skill)))
+        self._suffixes = [suffix for suffix, _ in suffixes]
+        self._suffix_ids = [i for _, i in suffixes]
+
+    def matching_skills(self, goal):
+        goal = goal.lower()
+        ids = set()
+        # Skills containing the goal: every suffix that starts with it
+        lo = bisect.bisect_left(self._suffixes, goal)
+        hi = bisect.bisect_left(self._suffixes, goal + '\U0010ffff')
+        ids.update(self._suffix_ids[lo:hi])
+        # Skills contained in the goal
+        for start in range(len(goal)):
+            for end in range(start + 1, min(len(goal), start + self._max_len) + 1):
+                skill_id = self._skill_ids.get(goal[start:end])
+                if skill_id is not None:
+                    ids.add(skill_id)
+        return sorted(ids)
+
+    def search(self, goal, k=None):
+        # Row positions of the matching courses, best rated first
+        postings = [self.postings[i] for i in self.matching_skills(goal)]
+        if not postings:
+            return np.array([], dtype=np.int64)
+        if k is None:
+            ranks = np.unique(np.concatenate(postings))
+        else:
+            ranks = []
+            for r in heapq.merge(*postings):
+                if not ranks or r != ranks[-1]:
+                    ranks.append(r)
+                    if len(ranks) == k:
+                        break
+            ranks = np.asarray(ranks, dtype=np.int64)
+        return self.order[ranks]
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _cached_index(name, version):
+    df = load_dataset(name)
+    return SkillIndex(df['skills_list'], df['rating'])
+
+def load_skill_index(name="course_catalog"):
+    # Built once per dataset version and shared across sessions
+    return _cached_index(name, dataset_version(name))
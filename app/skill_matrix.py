@@ -0,0 +1,95 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from app.core import dataset_version, load_dataset
+from app.lazy import lazy_import
+
+# Imported by the first matrix built, not when a page imports this module
+sparse = lazy_import("scipy.sparse")
+
+
+def build_vocabulary(*skill_columns):
+    # Sorted union of the skills in any number of skills_list columns
+    skills = set()
+    for column in skill_columns:
+        skills.update(column.explode().dropna())
+    return sorted(skills)
+
+def skill_matrix(skills_lists, vocabulary):
+    # Binary CSR matrix, one row per item and one column per vocabulary skill.
+    # Column indices inside a row keep the order of the item's skills_list.
+    skills_lists = pd.Series(list(skills_lists), dtype=object)
+    lengths = skills_lists.str.len().fillna(0).to_numpy(dtype=np.int64)
+    indptr = np.concatenate([[0], np.cumsum(lengths)])
+    flat = skills_lists.explode().dropna()
+    indices = pd.Index(vocabulary).get_indexer(flat)
+    data = np.ones(len(indices), dtype=np.int64)
+    return sparse.csr_matrix((data, indices, indptr), shape=(len(skills_lists), len(vocabulary)))
+
+
+class SkillDemand:
+    """Course scores against job demand, computed on sparse skill matrices.
+
+    Demand for a skill is the number of job postings listing it (a column sum
+    of the job matrix), a course's in_demand_skill_score is the sum of the
+    demand of its skills (a sparse mat-vec product), and filtering courses
+    by skill is a column-any over the selected columns.
+    """
+
+    def __init__(self, course_skills, job_skills):
+        self.vocabulary = build_vocabulary(course_skills, job_skills)
+        self._skill_ids = {skill: i for i, skill in enumerate(self.vocabulary)}
+        self.courses = skill_matrix(course_skills, self.vocabulary)
+        self.jobs = skill_matrix(job_skills, self.vocabulary)
+
+        self.job_counts = np.asarray(self.jobs.sum(axis=0)).ravel()
+        self.course_scores = self.courses @ self.job_counts
+        self.demand_skills = [skill for skill, count in zip(self.vocabulary, self.job_counts) if count > 0]
+        self.course_filtered_skills = self._in_demand_lists()
+        # Positions of courses with a positive score, highest score first
+        scores = pd.Series(self.course_scores)
+        self.top_courses = scores[scores > 0].sort_values(ascending=False).index.to_numpy()
+
+    def _in_demand_lists(self):
+        # Each course's skills_list restricted to skills that appear in jobs,
+        # in the original order
+        if self.courses.shape[0] == 0:
+            return []
+        names = np.asarray(self.vocabulary, dtype=object)[self.courses.indices]
+        keep = self.job_counts[self.courses.indices] > 0
+        kept_before = np.concatenate([[0], np.cumsum(keep)])
+        bounds = kept_before[self.courses.indptr]
+        return [part.tolist() for part in np.split(names[keep], bounds[1:-1])]
+
+    def skill_frequencies(self):
+        freq = pd.DataFrame({'skill': self.vocabulary, 'count': self.job_counts})
+        return freq[freq['count'] > 0].sort_values(by='count', ascending=False, kind='stable')
+
+    def courses_with_any(self, skills):
+        # Boolean mask over courses that list at least one of the skills
+        ids = [self._skill_ids[skill] for skill in skills if skill in self._skill_ids]
+        return self.courses[:, ids].getnnz(axis=1) > 0
+
+    def profile_matrix(self, profiles):
+        # Skill matrix of ad hoc skill lists; skills outside the vocabulary are
+        # dropped. Built directly, as requests often hold only a few lists.
+        ids = [[self._skill_ids[skill] for skill in profile if skill in self._skill_ids] for profile in profiles]
+        indptr = np.concatenate([[0], np.cumsum([len(row) for row in ids], dtype=np.int64)])
+        indices = np.fromiter(itertools.chain.from_iterable(ids), dtype=np.int64, count=indptr[-1])
+        return sparse.csr_matrix((np.ones(len(indices), dtype=np.int64), indices, indptr),
+                                 shape=(len(ids), len(self.vocabulary)))
+
+
+def demand_version():
+    return (dataset_version("courses"), dataset_version("jobs"))
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _cached_demand(version):
+    return SkillDemand(load_dataset("courses")['skills_list'], load_dataset("jobs")['skills_list'])
+
+def load_skill_demand():
+    # Built once per version of the course and job datasets
+    return _cached_demand(demand_version())
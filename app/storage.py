@@ -0,0 +1,28 @@
+import os
+
+# Where the data lives and the on-disk formats shared by the app and the
+# scripts. Kept free of Streamlit so preprocess.py can import it at start-up;
+# app.core re-exports all of it.
+
+# APP_DATA_DIR points the app at another copy of the data (benchmarks use it)
+DATA_DIR = os.environ.get("APP_DATA_DIR", os.path.join("app", "data"))
+# Directory of the published datasets for workers in shared mode (app.core)
+SHARED_DIR = os.environ.get("APP_SHARED_DIR")
+
+
+def skills_artifact_path(csv_path):
+    # preprocess.py writes skills_list next to each *_preprocessed.csv as an
+    # Arrow IPC file with a list<string> column, one row per CSV row
+    return os.path.splitext(csv_path)[0] + ".skills.arrow"
+
+def read_skills_artifact(csv_path):
+    # Memory-mapped skills_list column, or None if the artifact is missing,
+    # older than the CSV, or pyarrow is not available
+    path = skills_artifact_path(csv_path)
+    if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(csv_path):
+        return None
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return None
+    return pa.ipc.open_file(pa.memory_map(path)).read_all().column('skills_list')
@@ -0,0 +1,61 @@
+import numpy as np
+import streamlit as st
+
+from app.core import dataset_version, load_dataset
+
+# Score column -> subject name, in bit order of the struggle codes
+SUBJECTS = {
+    'math_score': 'Math',
+    'reading_score': 'Reading',
+    'writing_score': 'Writing',
+}
+DEFAULT_THRESHOLDS = {col: 60 for col in SUBJECTS}
+DEFAULT_RESOURCES = {
+    'Math': "Khan Academy - Math Basics",
+    'Reading': "Coursera - Reading Comprehension",
+    'Writing': "edX - Academic Writing Essentials",
+}
+NO_STRUGGLE_RESOURCES = ("Advanced Learning Track",)
+
+
+def struggle_matrix(df, thresholds=None):
+    # Boolean matrix (students x subjects): score below the subject's threshold
+    thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+    scores = df[list(SUBJECTS)].to_numpy(dtype=float)
+    return scores < np.array([thresholds[col] for col in SUBJECTS], dtype=float)
+
+def code_tables(resources=None):
+    # For every struggle bitmask, the tuple of subjects and of recommended resources
+    resources = {**DEFAULT_RESOURCES, **(resources or {})}
+    names = list(SUBJECTS.values())
+    subjects = np.empty(2 ** len(names), dtype=object)
+    recommended = np.empty(2 ** len(names), dtype=object)
+    for code in range(2 ** len(names)):
+        subjects[code] = tuple(name for bit, name in enumerate(names) if code >> bit & 1)
+        recommended[code] = tuple(resources[name] for name in subjects[code] if name in resources) or NO_STRUGGLE_RESOURCES
+    return subjects, recommended
+
+def annotate_struggles(df, thresholds=None, resources=None):
+    """Add struggling_subjects, struggle_count and recommended_resources.
+
+    The threshold test is one vectorized comparison; each row's bitmask of
+    struggling subjects then indexes precomputed subject and resource tuples.
+    """
+    struggles = struggle_matrix(df, thresholds)
+    codes = struggles @ (1 << np.arange(struggles.shape[1]))
+    subjects, recommended = code_tables(resources)
+    df['struggling_subjects'] = subjects[codes]
+    df['struggle_count'] = struggles.sum(axis=1)
+    df['recommended_resources'] = recommended[codes]
+    return df
+
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def _cached_struggles(name, version, thresholds):
+    return annotate_struggles(load_dataset(name), dict(thresholds))
+
+def load_struggles(thresholds=None, name="students_performance"):
+    # Annotated student frame, cached per dataset version and thresholds
+    thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+    df = _cached_struggles(name, dataset_version(name), tuple(sorted(thresholds.items())))
+    return df.copy(deep=False)
@@ -0,0 +1,151 @@
+import contextlib
+import math
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from app.core import stage
+from app.render import fingerprint
+
+# Rows per page offered by show_table
+PAGE_SIZES = (10, 25, 50, 100, 250)
+# Rows per chunk when writing a CSV export
+CSV_CHUNK_ROWS = int(os.environ.get("CSV_CHUNK_ROWS", "50000"))
+# Options pick_row sends to the browser at most
+MAX_OPTIONS = 200
+
+
+def sortable(values):
+    # Scalars sort; lists and tuples (skills_list, filtered_skills) do not,
+    # whether held as objects or, in shared mode, as Arrow lists. Object
+    # columns are judged by their first values.
+    if isinstance(values.dtype, pd.ArrowDtype):
+        import pyarrow as pa
+        return not pa.types.is_nested(values.dtype.pyarrow_dtype)
+    if values.dtype != object:
+        return True
+    return all(isinstance(value, str) for value in values.iloc[:100].dropna())
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def _cached_sort_order(_df, key, n_rows, version, column, descending):
+    # Keyed by the table as well as the version, as several tables may be
+    # shown at the same version (e.g. a dataset and a frame derived from it)
+    return sort_order(_df[column], descending)
+
+def sort_order(values, descending=False):
+    # Row positions that sort a column: stable, so ties keep the frame's
+    # order, and with missing values last in either direction
+    order = values.reset_index(drop=True).sort_values(ascending=not descending, kind="stable",
+                                                      na_position="last").index.to_numpy()
+    order.setflags(write=False)
+    return order
+
+def table_positions(df, key, version, rows=None, sort=None, descending=False):
+    """Positions into df of the rows to show, in display order.
+
+    rows selects a subset (e.g. a filter result) in its own order. A sort
+    column orders them by the permutation of the whole frame, computed once
+    per (table key, version, column, direction) and shared by every session
+    and subset.
+    """
+    positions = np.arange(len(df)) if rows is None else np.asarray(rows, dtype=np.int64)
+    if sort is None:
+        return positions
+    order = _cached_sort_order(df, key, len(df), version, sort, descending)
+    if rows is None:
+        return order
+    keep = np.zeros(len(df), dtype=bool)
+    keep[positions] = True
+    return order[keep[order]]
+
+def iter_csv(df, positions, columns, chunk_rows=None):
+    # CSV text of df.iloc[positions][columns], header first, then one piece
+    # per chunk of rows, so the whole result is never formatted at once
+    chunk_rows = chunk_rows or CSV_CHUNK_ROWS
+    columns = [df.columns.get_loc(col) for col in columns]
+    yield df.iloc[:0, columns].to_csv(index=False)
+    for start in range(0, len(positions), chunk_rows):
+        yield df.iloc[positions[start:start + chunk_rows], columns].to_csv(index=False, header=False)
+
+def csv_file(df, positions, columns):
+    # The export written chunk by chunk to a temporary file, opened for
+    # reading. st.download_button takes a BufferedReader but not the
+    # BufferedRandom of a TemporaryFile. The file is unlinked once open, so
+    # it goes away when the reader is closed (on Windows it stays behind).
+    with tempfile.NamedTemporaryFile("wb", suffix=".csv", delete=False) as f:
+        for chunk in iter_csv(df, positions, columns):
+            f.write(chunk.encode("utf-8"))
+    reader = open(f.name, "rb")
+    with contextlib.suppress(OSError):
+        os.remove(f.name)
+    return reader
+
+
+def show_table(df, key, version=None, rows=None, columns=None, page_size=25, file_name="table.csv"):
+    """A paginated, sortable view of df (or of its rows at `rows`).
+
+    Sorting, paging and column selection happen here, on the server; only
+    the visible page is sent to the browser. Sort permutations are cached per
+    `version`, which must change whenever df does (a dataset or model
+    version; by default a content hash of df, which costs a pass over it).
+    The CSV export of the full, sorted result is built only when clicked.
+    """
+    columns = list(columns or df.columns)
+    if version is None:
+        version = fingerprint(df)
+
+    sort_options = [None] + [col for col in columns if sortable(df[col])]
+    sort_col, order_col, size_col, page_col = st.columns([3, 2, 1, 1])
+    sort = sort_col.selectbox("Sort by", sort_options, key=f"{key}_sort",
+                              format_func=lambda col: "(current order)" if col is None else col)
+    descending = order_col.radio("Order", ["Ascending", "Descending"], key=f"{key}_order",
+                                 horizontal=True, disabled=sort is None) == "Descending"
+    size = size_col.selectbox("Rows per page", PAGE_SIZES, key=f"{key}_page_size",
+                              index=PAGE_SIZES.index(page_size) if page_size in PAGE_SIZES else 0)
+    with st.expander("Columns"):
+        shown = st.multiselect("Columns", columns, default=columns, key=f"{key}_columns",
+                               label_visibility="collapsed") or columns
+
+    with stage(f"table:{key}"):
+        positions = table_positions(df, key, version, rows, sort, descending)
+    pages = max(1, math.ceil(len(positions) / size))
+    # Filters may leave fewer pages than the page last shown
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = pages
+    page = page_col.number_input("Page", 1, pages, key=f"{key}_page")
+    start = (page - 1) * size
+    view = df.iloc[positions[start:start + size]][shown]
+    view.index = pd.RangeIndex(start, start + len(view))
+
+    st.dataframe(view)
+    end = start + len(view)
+    st.caption(f"Rows {start + 1 if len(view) else 0:,}–{end:,} of {len(positions):,}")
+    st.download_button("Download CSV", lambda: csv_file(df, positions, shown), file_name=file_name,
+                       mime="text/csv", key=f"{key}_csv")
+
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def _cached_search(_values, key, n_rows, version, text):
+    return np.flatnonzero(_values.str.contains(text, case=False, regex=False, na=False).to_numpy())
+
+def pick_row(df, key, label, search_column, format_func, version=None):
+    """Position of a row of df picked in a selectbox, or None.
+
+    A selectbox over every row sends all of their labels on each rerun, so
+    this one offers the first MAX_OPTIONS rows whose search_column contains
+    a search text (found on the server, once per version and text).
+    """
+    if version is None:
+        version = fingerprint(df[[search_column]])
+    text = st.text_input(f"Search {search_column.replace('_', ' ')}:", key=f"{key}_search").strip()
+    positions = (_cached_search(df[search_column], key, len(df), version, text.lower()) if text
+                 else np.arange(len(df)))
+    if not len(positions):
+        st.info(f"No {search_column.replace('_', ' ')} contains \"{text}\".")
+        return None
+    if len(positions) > MAX_OPTIONS:
+        st.caption(f"Showing the first {MAX_OPTIONS:,} of {len(positions):,} matches; search to narrow them down.")
+    return st.selectbox(label, positions[:MAX_OPTIONS].tolist(), format_func=format_func, key=key)
@@ -0,0 +1,82 @@
+"""Measure each page's import cost with `python -X importtime`.
+
+Runs the top-level import statements of Home.py and every Task page in a
+fresh interpreter that has already imported streamlit (as the server has),
+and reports the marginal import time and the slowest modules. Also reports
+what importing app.lazy.HEAVY_MODULES eagerly would cost. Exits with status
+1 if a page exceeds --budget-ms.
+
+    python -m benchmarks.imports --budget-ms 500
+"""
+import argparse
+import ast
+import json
+import subprocess
+import sys
+
+from benchmarks.pages import PAGES
+
+MARKER = "--- page imports ---"
+
+
+def page_imports(path):
+    # Source of the page's module-level import statements
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+def import_times(code, preload="import streamlit"):
+    # {module: cumulative microseconds} for the top-level imports of `code`
+    script = f"{preload}\nimport sys\nprint({MARKER!r}, file=sys.stderr, flush=True)\n{code}\n"
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", script],
+                         capture_output=True, text=True, check=True)
+    lines = out.stderr.split(MARKER, 1)[1].splitlines()
+    times = {}
+    for line in lines:
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        # Top-level entries are indented by exactly one space
+        if len(name) - len(name.lstrip()) == 1:
+            times[name.strip()] = int(cumulative)
+    return times
+
+def measure(path, top=5):
+    times = import_times(page_imports(path))
+    slowest = sorted(times.items(), key=lambda item: -item[1])[:top]
+    return {"page": path, "import_ms": round(sum(times.values()) / 1000, 1),
+            "slowest": [{"module": name, "ms": round(us / 1000, 1)} for name, us in slowest]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", nargs="+", default=PAGES)
+    parser.add_argument("--budget-ms", type=float, help="fail if a page's imports take longer")
+    parser.add_argument("--output", help="also write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    from app.lazy import HEAVY_MODULES
+
+    report = {"pages": [measure(page) for page in args.pages]}
+    heavy = import_times("\n".join(f"import {name}" for name in HEAVY_MODULES))
+    report["deferred_ms"] = round(sum(heavy.values()) / 1000, 1)
+
+    for result in report["pages"]:
+        slowest = ", ".join(f"{m['module']} {m['ms']}ms" for m in result["slowest"][:3])
+        print(f"{result['page']:<18} {result['import_ms']:>8.1f} ms  ({slowest})")
+    print(f"{'deferred modules':<18} {report['deferred_ms']:>8.1f} ms  (app.lazy.HEAVY_MODULES, imported eagerly)")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.budget_ms is not None:
+        over = [r["page"] for r in report["pages"] if r["import_ms"] > args.budget_ms]
+        if over:
+            print(f"over the {args.budget_ms:g} ms import budget: {', '.join(over)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
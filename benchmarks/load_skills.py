@@ -0,0 +1,76 @@
+"""Compare loading skills_list from the CSV repr against the Arrow artifact.
+
+Builds a scaled copy of courses_preprocessed.csv (and its .skills.arrow file)
+in a temporary directory, then loads it in a fresh subprocess per method and
+reports wall time and peak RSS growth.
+
+    python -m benchmarks.load_skills --scale 50
+"""
+import argparse
+import ast
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+SOURCE = "app/data/courses_preprocessed.csv"
+
+
+def _resident_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+def _measure(method, csv_path):
+    # Streamlit imports pyarrow anyway, so keep its import cost out of both numbers
+    import pyarrow  # noqa: F401
+    from app.core import load_preprocessed
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if method == "csv":
+        df = pd.read_csv(csv_path)
+        df['skills_list'] = df['skills_list'].apply(ast.literal_eval)
+    else:
+        df = load_preprocessed(csv_path)
+    seconds = time.perf_counter() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux
+    return {"method": method, "rows": len(df), "seconds": round(seconds, 4),
+            "peak_rss_growth_mb": round((rss_after - rss_before) / 1024, 1),
+            "rss_after_mb": round(_resident_mb(), 1)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=10, help="copies of the bundled courses file")
+    parser.add_argument("--measure", nargs=2, metavar=("METHOD", "CSV"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.measure:
+        print(json.dumps(_measure(*args.measure)))
+        return
+
+    from preprocess import write_skills_artifact
+    from app.core import skills_artifact_path
+
+    with tempfile.TemporaryDirectory() as tmp:
+        df = pd.read_csv(SOURCE)
+        df = pd.concat([df] * args.scale, ignore_index=True)
+        csv_path = os.path.join(tmp, "courses_preprocessed.csv")
+        df.to_csv(csv_path, index=False)
+        write_skills_artifact(skills_artifact_path(csv_path), df['skills_list'].apply(ast.literal_eval).tolist())
+
+        for method in ("csv", "arrow"):
+            out = subprocess.run([sys.executable, "-m", "benchmarks.load_skills", "--measure", method, csv_path],
+                                 check=True, capture_output=True, text=True)
+            print(out.stdout.strip())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark job-to-course matching against brute force.
+
+Builds course and job skill matrices at `--scale` times the bundled size
+(skill lists redrawn from the bundled distributions), computes the exact
+top-k courses per job by dense all-pairs scoring, and compares the sparse
+product and MinHash LSH at several band counts on time and recall@k.
+
+    python -m benchmarks.matching --scale 10 --k 10 --bands 16 32 64
+"""
+import argparse
+import ast
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.matching import SkillMatcher, binary_rows
+from app.skill_matrix import build_vocabulary, skill_matrix
+from benchmarks.pages import _synthetic_skills_chunked
+
+
+def _skills(path, scale, rng):
+    skills = pd.read_csv(path, usecols=["skills_list"])["skills_list"].apply(ast.literal_eval)
+    return pd.Series(_synthetic_skills_chunked(skills, len(skills) * scale, rng)) if scale > 1 else skills
+
+def brute_force(jobs, courses, k, metric, block=512):
+    # Exact top-k by dense scoring of every (job, course) pair
+    jobs, courses = binary_rows(jobs), binary_rows(courses)
+    course_dense = courses.toarray().T
+    course_size = course_dense.sum(axis=0)
+    pairs = []
+    for start in range(0, jobs.shape[0], block):
+        job_dense = jobs[start:start + block].toarray()
+        shared = job_dense @ course_dense
+        job_size = job_dense.sum(axis=1, keepdims=True)
+        if metric == "jaccard":
+            scores = shared / np.maximum(job_size + course_size - shared, 1)
+        else:
+            scores = shared / np.maximum(job_size, 1)
+        top = np.argsort(-scores, axis=1, kind='stable')[:, :k]
+        for row, cols in enumerate(top):
+            pairs.extend((start + row, col) for col in cols if scores[row, col] > 0)
+    return set(pairs)
+
+def _timed(run):
+    start = time.perf_counter()
+    result = run()
+    return result, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--metric", choices=["coverage", "jaccard"], default="jaccard")
+    parser.add_argument("--bands", type=int, nargs="+", default=[16, 32, 64])
+    parser.add_argument("--num-perm", type=int, default=128)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    course_skills = _skills("app/data/courses_preprocessed.csv", args.scale, rng)
+    job_skills = _skills("app/data/jobs_preprocessed.csv", args.scale, rng)
+    vocabulary = build_vocabulary(course_skills, job_skills)
+    courses, jobs = skill_matrix(course_skills, vocabulary), skill_matrix(job_skills, vocabulary)
+    print(f"{jobs.shape[0]:,} jobs x {courses.shape[0]:,} courses, {len(vocabulary)} skills, k={args.k}, {args.metric}")
+
+    exact, seconds = _timed(lambda: brute_force(jobs, courses, args.k, args.metric))
+    print(f"{'brute force':<22} {seconds:>8.2f}s  recall 1.000")
+
+    matcher = SkillMatcher(courses, jobs)
+    runs = [("sparse", {"method": "sparse"})]
+    runs += [(f"minhash bands={bands}", {"method": "minhash", "num_perm": args.num_perm, "bands": bands})
+             for bands in args.bands]
+    for label, params in runs:
+        result, seconds = _timed(lambda: matcher.courses_for_jobs(k=args.k, metric=args.metric, **params))
+        found = set(zip(result["job"], result["course"]))
+        # Both sides break ties by course position, so exact methods reach 1.0
+        recall = len(found & exact) / max(len(exact), 1)
+        print(f"{label:<22} {seconds:>8.2f}s  recall {recall:.3f}  ({len(result):,} matches)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Report the memory the typed READ_OPTIONS save per dataset.
+
+Reads every file-backed dataset twice, with pandas' default dtypes and all
+columns, and with its declared dtypes and usecols, and prints the deep
+memory usage of both (before cleaning).
+
+    python -m benchmarks.memory
+    APP_DATA_DIR=/tmp/synthetic/scale-100 python -m benchmarks.memory
+"""
+import argparse
+import json
+
+from app.core import DATASETS, read_dataset
+
+
+def _mb(df):
+    return df.memory_usage(deep=True).sum() / 2 ** 20
+
+def memory_report(names=None):
+    names = names or [name for name, spec in DATASETS.items() if "path" in spec]
+    report = []
+    for name in names:
+        default, typed = _mb(read_dataset(name, typed=False)), _mb(read_dataset(name))
+        report.append({"dataset": name, "default_mb": round(default, 2), "typed_mb": round(typed, 2),
+                       "saved_pct": round(100 * (1 - typed / default), 1) if default else 0.0})
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("datasets", nargs="*", help="dataset names (default: all file-backed)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = memory_report(args.datasets)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    for row in report:
+        print(f"{row['dataset']:<22} {row['default_mb']:>9.2f} MB -> {row['typed_mb']:>9.2f} MB  ({row['saved_pct']:.1f}% saved)")
+    default = sum(row["default_mb"] for row in report)
+    typed = sum(row["typed_mb"] for row in report)
+    print(f"{'total':<22} {default:>9.2f} MB -> {typed:>9.2f} MB  ({100 * (1 - typed / default):.1f}% saved)")
+
+
+if __name__ == "__main__":
+    main()
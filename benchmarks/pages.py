@@ -0,0 +1,229 @@
+"""Time every page headlessly against synthetic datasets of increasing size.
+
+For each scale, writes a synthetic copy of app/data with `scale` times the
+bundled rows and materializes the pages' summary tables as preprocess.py
+does (unless --no-aggregates). Then runs Home.py and pages/Task1-5.py through
+Streamlit's AppTest in a fresh subprocess per page (APP_DATA_DIR points the
+app at the copy). Records the cold first run, the rerun after each scripted
+widget interaction and the peak RSS, and writes everything to one JSON file.
+Runs are timed to the first response ("seconds") and to when the background
+jobs they started are done and a rerun shows their results ("settled_seconds").
+
+    python -m benchmarks.pages --scales 1 10 100 --output pages.json
+"""
+import argparse
+import ast
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+DATA_DIR = os.path.join("app", "data")
+PAGES = ["Home.py", "pages/Task1.py", "pages/Task2.py", "pages/Task3.py", "pages/Task4.py", "pages/Task5.py"]
+
+# Widget interactions replayed after the cold run, as (label, action)
+INTERACTIONS = {
+    "pages/Task1.py": [
+        ("goal: data", lambda at: at.sidebar.text_input[0].input("data")),
+        ("goal: python", lambda at: at.sidebar.text_input[0].input("python")),
+        ("catalog page", lambda at: at.number_input(key="catalog_page").set_value(2)),
+    ],
+    "pages/Task2.py": [
+        ("skill filter", lambda at: at.multiselect(key="skills").select(at.multiselect(key="skills").options[0])),
+        ("facet filter", lambda at: at.multiselect(key="facet_partner").select(
+            at.multiselect(key="facet_partner").options[0])),
+        ("rating range", lambda at: at.slider(key="rating_range").set_range(4.5, 5.0)),
+        ("top n", lambda at: at.slider[0].set_value(20)),
+        ("table sort", lambda at: at.selectbox(key="top_courses_sort").select("rating")),
+        ("table page", lambda at: at.number_input(key="top_courses_page").set_value(2)),
+    ],
+    "pages/Task3.py": [
+        ("k clusters", lambda at: at.slider[0].set_value(6)),
+    ],
+    "pages/Task4.py": [
+        ("math threshold", lambda at: at.sidebar.number_input[0].set_value(50)),
+    ],
+    "pages/Task5.py": [
+        ("job roles", lambda at: at.multiselect[0].select("Manager")),
+        ("department", lambda at: at.selectbox[0].select(at.selectbox[0].options[1])),
+    ],
+}
+
+
+# Synthetic data
+
+def _synthetic_skills(skills_lists, n, rng):
+    # Skill lists with the bundled length distribution, skills drawn without
+    # replacement in proportion to their bundled frequency
+    lengths = skills_lists.str.len().to_numpy()
+    counts = skills_lists.explode().dropna().value_counts()
+    vocabulary = counts.index.to_numpy()
+    weights = counts.to_numpy() / counts.sum()
+    sizes = np.minimum(rng.choice(lengths, size=n), len(vocabulary))
+    # Gumbel top-k: each row keeps the `size` highest perturbed log-weights
+    keys = np.log(weights) - np.log(-np.log(rng.random((n, len(vocabulary)))))
+    order = np.argsort(-keys, axis=1)
+    return [vocabulary[order[i, :size]].tolist() for i, size in enumerate(sizes)]
+
+def _synthetic_skills_chunked(skills_lists, n, rng, chunk=10000):
+    out = []
+    for start in range(0, n, chunk):
+        out.extend(_synthetic_skills(skills_lists, min(chunk, n - start), rng))
+    return out
+
+def write_synthetic_data(out_dir, scale, seed=0):
+    """Write app/data at `scale` times its size into out_dir; rows are resampled
+    from the bundled files and skills_list is redrawn per row."""
+    from preprocess import write_skills_artifact
+    from app.core import skills_artifact_path
+
+    rng = np.random.default_rng(seed)
+    rows = {}
+    for name in sorted(os.listdir(DATA_DIR)):
+        src = os.path.join(DATA_DIR, name)
+        if not name.endswith(".csv") or not os.path.isfile(src):
+            continue
+        sep = ";" if name == "3_student-mat.csv" else ","
+        df = pd.read_csv(src, sep=sep)
+        df = df.iloc[rng.integers(0, len(df), size=len(df) * scale)].reset_index(drop=True)
+        dst = os.path.join(out_dir, name)
+        if name.endswith("_preprocessed.csv"):
+            skills = pd.read_csv(src, usecols=["skills_list"])["skills_list"].apply(ast.literal_eval)
+            df["skills_list"] = _synthetic_skills_chunked(skills, len(df), rng)
+            write_skills_artifact(skills_artifact_path(dst), df["skills_list"].tolist())
+            df["skills_list"] = df["skills_list"].astype(str)
+        df.to_csv(dst, sep=sep, index=False)
+        rows[name] = len(df)
+    return rows
+
+
+# Measurement
+
+def _peak_rss_mb():
+    # VmHWM, not ru_maxrss: the latter survives exec and would report the
+    # parent's peak from writing the synthetic data
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return round(int(line.split()[1]) / 1024, 1)
+
+def _timed_run(at):
+    # Seconds to the first response and to the settled page: AppTest does not
+    # run the pages' polling fragments, so rerun after the jobs are done
+    from app.jobs import job_runner
+
+    start = time.perf_counter()
+    at.run()
+    first = time.perf_counter() - start
+    while running := job_runner().running():
+        for job in running:
+            job.wait()
+        at.run()
+    return round(first, 4), round(time.perf_counter() - start, 4)
+
+def _measure(page):
+    from streamlit.testing.v1 import AppTest
+
+    # AppTest resolves relative paths against this file, not the cwd
+    at = AppTest.from_file(os.path.abspath(page), default_timeout=3600)
+    cold, settled = _timed_run(at)
+    result = {"page": page, "cold_seconds": cold, "cold_settled_seconds": settled, "reruns": []}
+    errors = [e.value for e in at.exception]
+    for label, action in INTERACTIONS.get(page, []):
+        if errors:
+            break
+        action(at)
+        seconds, settled = _timed_run(at)
+        result["reruns"].append({"interaction": label, "seconds": seconds, "settled_seconds": settled})
+        errors = [e.value for e in at.exception]
+    result["peak_rss_mb"] = _peak_rss_mb()
+    result["errors"] = errors
+    return result
+
+def _run_page(page, data_dir):
+    env = {**os.environ, "APP_DATA_DIR": data_dir, "PYTHONPATH": os.getcwd()}
+    out = subprocess.run([sys.executable, "-m", "benchmarks.pages", "--measure", page],
+                         env=env, capture_output=True, text=True)
+    if out.returncode != 0:
+        return {"page": page, "errors": [out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "failed"]}
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _materialize(data_dir):
+    # As run_app.sh does: the models first, which the cluster summaries are
+    # computed with. In fresh interpreters, which import app.core for this
+    # data directory
+    env = {**os.environ, "APP_DATA_DIR": data_dir}
+    subprocess.run([sys.executable, "update_models.py"], env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    subprocess.run([sys.executable, "-c", "from app.aggregates import materialize_aggregates; "
+                    "materialize_aggregates()"], env=env, check=True, stderr=subprocess.DEVNULL)
+
+def _bench_scale(scale, data_dir, pages, aggregates=True):
+    start = time.perf_counter()
+    rows = write_synthetic_data(data_dir, scale)
+    print(f"scale {scale}: data written in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    if aggregates:
+        start = time.perf_counter()
+        _materialize(data_dir)
+        print(f"scale {scale}: aggregates materialized in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    results = []
+    for page in pages:
+        result = {"scale": scale, "rows": rows, **_run_page(page, data_dir)}
+        print(f"  {page}: cold {result.get('cold_seconds')}s, peak {result.get('peak_rss_mb')} MB"
+              + (f", errors {result['errors']}" if result["errors"] else ""), file=sys.stderr)
+        results.append(result)
+    return results
+
+def _commit():
+    out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True)
+    return out.stdout.strip() or None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100, 1000],
+                        help="multiples of the bundled data size")
+    parser.add_argument("--pages", nargs="+", default=PAGES)
+    parser.add_argument("--output", help="JSON file to write (default: pages-<commit>.json)")
+    parser.add_argument("--keep-data", metavar="DIR", help="write the synthetic data under DIR and keep it")
+    parser.add_argument("--no-aggregates", action="store_true",
+                        help="leave the summary tables for the pages to compute")
+    parser.add_argument("--measure", metavar="PAGE", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.measure:
+        print(json.dumps(_measure(args.measure)))
+        return
+
+    commit = _commit()
+    report = {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "aggregates": not args.no_aggregates,
+        "results": [],
+    }
+    for scale in args.scales:
+        if args.keep_data:
+            data_dir = os.path.join(args.keep_data, f"scale-{scale}")
+            os.makedirs(data_dir, exist_ok=True)
+            report["results"].extend(_bench_scale(scale, data_dir, args.pages, not args.no_aggregates))
+        else:
+            with tempfile.TemporaryDirectory() as data_dir:
+                report["results"].extend(_bench_scale(scale, data_dir, args.pages, not args.no_aggregates))
+
+    output = args.output or f"pages-{commit or 'worktree'}.json"
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
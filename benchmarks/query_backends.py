@@ -0,0 +1,74 @@
+"""Check that every available query backend returns the pandas results, and time them.
+
+Runs the page queries (and a few file scans) through app.core.run_query on
+each backend, compares each result with the pandas backend's, and reports
+the best of --repeat timings. Point APP_DATA_DIR at a synthetic copy of the
+data (see benchmarks.pages --keep-data) to time larger tables.
+
+    python -m benchmarks.query_backends --repeat 5
+"""
+import argparse
+import sys
+import time
+
+import pandas as pd
+
+from app.core import available_backends, load_dataset, run_query
+from app.struggles import SUBJECTS, load_struggles
+
+
+def queries():
+    # (label, source, query) for the queries the pages run plus file scans
+    catalog = load_dataset("course_catalog")
+    struggles = load_struggles()
+    return [
+        ("Task1 top rated", catalog, dict(columns=['course', 'rating', 'reviewcount'],
+                                          order_by=[('rating', False), ('reviewcount', False)], limit=10)),
+        ("Task1 popular", catalog, dict(columns=['course', 'rating'], where=[('reviewcount', '>', 50000)],
+                                        order_by=[('rating', False)], limit=20)),
+        ("Task4 by struggle count", struggles, dict(group_by=['struggle_count'],
+                                                    aggregate={col: (col, 'mean') for col in SUBJECTS})),
+        ("scan hr by role", "hr_clean", dict(group_by=['Department', 'JobRole'],
+                                             aggregate={'employees': ('MonthlyIncome', 'count'),
+                                                        'income': ('MonthlyIncome', 'mean')})),
+        ("scan courses filter", "courses", dict(columns=['course', 'partner', 'rating'],
+                                                where=[('rating', '>=', 4.8)], order_by=[('rating', False)],
+                                                limit=50)),
+    ]
+
+def _best_time(run, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    backends = available_backends()
+    mismatches = 0
+    for label, source, query in queries():
+        expected, _ = _best_time(lambda: run_query(source, backend="pandas", **query), 1)
+        timings = []
+        for backend in backends:
+            result, seconds = _best_time(lambda: run_query(source, backend=backend, **query), args.repeat)
+            try:
+                pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_categorical=False,
+                                              check_index_type=False, check_column_type=False)
+                status = ""
+            except AssertionError:
+                mismatches += 1
+                status = " MISMATCH"
+            timings.append(f"{backend} {seconds * 1000:.1f}ms{status}")
+        print(f"{label:<26} {len(expected):>7} rows  " + "  ".join(timings))
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
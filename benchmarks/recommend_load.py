@@ -0,0 +1,137 @@
+"""Load-test the recommendation HTTP service.
+
+Starts `recommend.py serve` on a free local port (or targets --url), then
+sends --requests POST /recommend requests over --concurrency keep-alive
+connections. Each request carries --goals goals drawn from the course skills
+and --profiles skill profiles drawn from the job postings. Reports requests
+per second and latency percentiles.
+
+    python -m benchmarks.recommend_load --requests 2000 --concurrency 16 --goals 10 --profiles 10
+"""
+import argparse
+import asyncio
+import json
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from app.core import load_dataset
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def request_bodies(n, goals, profiles, k, seed=0):
+    rng = np.random.default_rng(seed)
+    skills = load_dataset("course_catalog")['skills_list'].explode().dropna().unique()
+    jobs = [list(skills_list) for skills_list in load_dataset("jobs")['skills_list'] if len(skills_list)]
+    bodies = []
+    for _ in range(n):
+        body = {"k": k, "goals": rng.choice(skills, goals).tolist(),
+                "profiles": [jobs[i] for i in rng.integers(0, len(jobs), profiles)]}
+        bodies.append(json.dumps(body).encode())
+    return bodies
+
+async def _post(reader, writer, host, body):
+    writer.write(f"POST /recommend HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode().partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+async def run_load(host, port, bodies, concurrency):
+    # Latencies (seconds) and error count of every request, and the wall time
+    queue = asyncio.Queue()
+    for body in bodies:
+        queue.put_nowait(body)
+    latencies, errors = [], 0
+
+    async def client():
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while not queue.empty():
+                body = queue.get_nowait()
+                start = time.perf_counter()
+                status = await _post(reader, writer, host, body)
+                latencies.append(time.perf_counter() - start)
+                errors += status != 200
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return np.array(latencies), errors, time.perf_counter() - start
+
+async def _wait_ready(host, port, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise TimeoutError(f"service on {host}:{port} did not start within {timeout}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="host:port of a running service (default: start one)")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--goals", type=int, default=10, help="goals per request")
+    parser.add_argument("--profiles", type=int, default=10, help="skill profiles per request")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=50, help="requests sent before measuring")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.url:
+        host, port = args.url.rsplit(":", 1)
+        port = int(port)
+    else:
+        host, port = "127.0.0.1", _free_port()
+        # The service starts listening only after its datasets and indexes are loaded
+        server = subprocess.Popen([sys.executable, "recommend.py", "serve", "--host", host, "--port", str(port)],
+                                  stderr=subprocess.DEVNULL)
+    try:
+        asyncio.run(_wait_ready(host, port))
+        bodies = request_bodies(args.warmup + args.requests, args.goals, args.profiles, args.k)
+        asyncio.run(run_load(host, port, bodies[:args.warmup], args.concurrency))
+        latencies, errors, seconds = asyncio.run(run_load(host, port, bodies[args.warmup:], args.concurrency))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    report = {"requests": len(latencies), "errors": int(errors), "concurrency": args.concurrency,
+              "goals": args.goals, "profiles": args.profiles, "seconds": round(seconds, 3),
+              "rps": round(len(latencies) / seconds, 1), "p50_ms": round(p50, 2), "p95_ms": round(p95, 2),
+              "p99_ms": round(p99, 2), "max_ms": round(latencies.max() * 1000, 2)}
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{report['requests']} requests ({args.goals} goals + {args.profiles} profiles each), "
+              f"concurrency {args.concurrency}, {report['errors']} errors")
+        print(f"{report['rps']:.1f} req/s  p50 {report['p50_ms']:.1f} ms  p95 {report['p95_ms']:.1f} ms  "
+              f"p99 {report['p99_ms']:.1f} ms  max {report['max_ms']:.1f} ms")
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Compare worker memory with per-process CSV loading and with shared mode.
+
+Writes synthetic data at --scale times the bundled size, publishes it as in
+`preprocess.py --publish`, then starts --workers processes at once for each
+mode. Each worker loads every dataset and touches all of its columns, and
+reports wall time and the growth of its resident (RSS), proportional (PSS,
+shared pages divided among the processes mapping them) and private memory.
+All workers are alive when memory is read, so shared pages are counted once
+across them.
+
+    python -m benchmarks.shared_memory --scale 100 --workers 4
+"""
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.pages import write_synthetic_data
+
+MODES = ("files", "shared")
+
+
+def _memory_mb():
+    # Rss, Pss and Private_* from smaps_rollup, in MB
+    values = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                values[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {"rss": values["Rss"], "pss": values["Pss"],
+            "private": values["Private_Clean"] + values["Private_Dirty"]}
+
+def _touch(df):
+    # Read every value once, as pages rendering the data would
+    for col in df.columns:
+        values = df[col]
+        if values.dtype.kind in "biuf":
+            values.sum()
+        elif col == "skills_list":
+            # As the skill pages do
+            values.explode().value_counts()
+        else:
+            values.astype(str).str.len().sum()
+
+def _worker(barrier, results):
+    from app.core import DATASETS, load_dataset
+
+    before = _memory_mb()
+    start = time.perf_counter()
+    for name in DATASETS:
+        _touch(load_dataset(name))
+    seconds = time.perf_counter() - start
+    barrier.wait()
+    after = _memory_mb()
+    results.put({"seconds": seconds, **{key: after[key] - before[key] for key in after}})
+    barrier.wait()
+
+def run_mode(workers):
+    context = multiprocessing.get_context("spawn")
+    barrier, results = context.Barrier(workers), context.Queue()
+    processes = [context.Process(target=_worker, args=(barrier, results)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    reports = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return reports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir, shared_dir = os.path.join(tmp, "data"), os.path.join(tmp, "shared")
+        os.makedirs(data_dir)
+        write_synthetic_data(data_dir, args.scale)
+        # Publishing and the workers run in fresh interpreters, which import
+        # app.core under these settings
+        os.environ["APP_DATA_DIR"] = data_dir
+        subprocess.run([sys.executable, "-c", f"from app.core import publish_datasets; "
+                        f"publish_datasets({shared_dir!r})"], check=True, stderr=subprocess.DEVNULL)
+
+        print(f"scale {args.scale}, {args.workers} workers; memory growth per worker while loading every dataset")
+        for mode in MODES:
+            if mode == "shared":
+                os.environ["APP_SHARED_DIR"] = shared_dir
+            else:
+                os.environ.pop("APP_SHARED_DIR", None)
+            reports = run_mode(args.workers)
+            mean = {key: sum(r[key] for r in reports) / len(reports) for key in reports[0]}
+            print(f"{mode:<7} load {mean['seconds']:6.2f}s  RSS {mean['rss']:8.1f} MB  PSS {mean['pss']:8.1f} MB  "
+                  f"private {mean['private']:8.1f} MB  (total PSS {mean['pss'] * len(reports):8.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
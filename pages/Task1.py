@@ -1,35 +1,22 @@
 # pages/Task2.py
 
 import streamlit as st
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-import ast
-import os
+from app.aggregates import load_aggregate
+from app.core import begin_page, end_page, dataset_version, load_dataset, run_query, stage
+from app.lazy import lazy_import
+from app.render import show_figure
+from app.skill_index import load_skill_index
+from app.tables import show_table
+
+# seaborn is imported when the first chart is drawn, not at page load
+sns = lazy_import("seaborn")
 
 st.set_page_config(page_title="Course Explorer", layout="wide")
 st.title("📚 Course Explorer and Recommendations")
+begin_page("Task1")
 
-# Load Data
-@st.cache_data
-def load_data():
-    file_path = os.path.join("app", "data", "courses_preprocessed.csv")  # adjust if needed
-    df = pd.read_csv(file_path)
-    df['skills_list'] = df['skills_list'].apply(ast.literal_eval)
-    return df
-
-courses_df = load_data()
-
-# Data Cleaning
-courses_df['level'] = courses_df['level'].fillna('Unknown').str.strip()
-courses_df = courses_df.dropna(subset=['rating'])
-courses_df['reviewcount'] = courses_df['reviewcount'].apply(
-    lambda x: int(float(x.replace('k', '')) * 1000) if isinstance(x, str) and 'k' in x else (
-        int(x) if str(x).isdigit() else np.nan)
-)
-courses_df['rating'] = pd.to_numeric(courses_df['rating'], errors='coerce')
-courses_df['duration'] = courses_df['duration'].str.replace(' Months', '').str.replace(' - ', '-')
+# Load Data (cleaned once per process in app.core)
+courses_df = load_dataset("course_catalog")
 
 # Sidebar Controls
 st.sidebar.header("🔎 Filter Options")
@@ -40,47 +27,58 @@ tab1, tab2, tab3 = st.tabs(["Overview", "Recommendations", "Visualizations"])
 
 with tab1:
     st.subheader("Dataset Summary")
-    st.dataframe(courses_df.head(10))
+    show_table(courses_df, "catalog", version=dataset_version("course_catalog"), page_size=10,
+               file_name="courses.csv")
     st.write("Shape:", courses_df.shape)
-    st.write("Missing Values:", courses_df.isnull().sum().sum())
-    st.write("Unique Skills:", len(set(skill for sublist in courses_df['skills_list'].dropna() for skill in sublist)))
+    # Dataset-wide counts are materialized by preprocess.py (app.aggregates)
+    with stage("summary_aggregates"):
+        missing_values = load_aggregate("missing_values", dataset="course_catalog")
+        all_skill_counts = load_aggregate("course_skill_counts")['count']
+    st.write("Missing Values:", missing_values)
+    st.write("Unique Skills:", len(all_skill_counts))
 
 with tab2:
     st.subheader("Course Recommendations")
 
     if goal_input:
         st.markdown(f"### 🔍 Top Courses for Goal: `{goal_input}`")
-        recommended = courses_df[courses_df['skills_list'].apply(
-            lambda x: any(goal_input.lower() in skill.lower() or skill.lower() in goal_input.lower() for skill in x) if x else False)
-        ]
-        recommended = recommended.sort_values(by='rating', ascending=False).reset_index(drop=True)
-        st.dataframe(recommended[['course', 'rating']].head(10))
+        # Matching skills and their presorted postings come from the index
+        with stage("goal_search"):
+            top = load_skill_index().search(goal_input, k=10)
+        recommended = courses_df.iloc[top].reset_index(drop=True)
+        st.dataframe(recommended[['course', 'rating']])
     else:
         st.markdown("### 🎯 Top 10 Courses (Rating + Reviews)")
-        top_courses = courses_df.sort_values(by=['rating', 'reviewcount'], ascending=[False, False]).reset_index(drop=True).head(10)
+        # Top-k query: only the ten displayed rows are materialized
+        with stage("top_rated"):
+            top_courses = run_query(courses_df, columns=['course', 'rating', 'reviewcount'],
+                                    order_by=[('rating', False), ('reviewcount', False)], limit=10)
         st.dataframe(top_courses[['course', 'rating', 'reviewcount']])
         st.info("Enter a goal from the sidebar to see goal-based recommendations.")
 
 with tab3:
     st.subheader("Top Skills by Course Frequency")
-    skill_counts = courses_df['skills_list'].explode().value_counts().head(15)
+    skill_counts = all_skill_counts.head(15)
+
+    # Figures are rendered once per data fingerprint and served from the render cache
+    def draw_skill_counts(ax, skill_counts):
+        sns.barplot(x=skill_counts.values, y=skill_counts.index, palette="viridis", ax=ax)
+        ax.set_xlabel("Number of Courses")
+        ax.set_ylabel("Skills")
+        ax.set_title("Top 15 Skill Distribution")
 
-    plt.figure(figsize=(12, 6))
-    sns.barplot(x=skill_counts.values, y=skill_counts.index, palette="viridis")
-    plt.xlabel("Number of Courses")
-    plt.ylabel("Skills")
-    plt.title("Top 15 Skill Distribution")
-    st.pyplot(plt.gcf())
-    plt.clf()
+    show_figure(draw_skill_counts, skill_counts, figsize=(12, 6))
 
     st.subheader("Top 20 Courses by Rating (min 50k reviews)")
-    top_rating = courses_df[courses_df['reviewcount'] > 50000][['course', 'rating']].sort_values(by='rating', ascending=False).head(20)
+    with stage("top_rated_popular"):
+        top_rating = run_query(courses_df, columns=['course', 'rating'], where=[('reviewcount', '>', 50000)],
+                               order_by=[('rating', False)], limit=20)
     
-    plt.figure(figsize=(12, 8))
-    sns.barplot(x='rating', y='course', data=top_rating, palette='Blues_r')
-    plt.title("Top 20 Courses by Rating")
-    st.pyplot(plt.gcf())
-    plt.clf()
+    def draw_top_rating(ax, top_rating):
+        sns.barplot(x='rating', y='course', data=top_rating, palette='Blues_r', ax=ax)
+        ax.set_title("Top 20 Courses by Rating")
+
+    show_figure(draw_top_rating, top_rating, figsize=(12, 8))
 
     # st.subheader("Heatmap: Top Courses by Rating & Popularity")
     # if 'popularity' not in courses_df.columns:
@@ -99,8 +97,10 @@ with tab3:
     valid_levels = ['Beginner', 'Intermediate', 'Advanced']
     filtered_df = courses_df[courses_df['level'].isin(valid_levels)]
     
-    plt.figure(figsize=(10, 6))
-    sns.countplot(data=filtered_df, x='level', order=valid_levels, palette='viridis')
-    plt.title("Skill Distribution of Goals")
-    st.pyplot(plt.gcf())
-    plt.clf()
+    def draw_levels(ax, levels):
+        sns.countplot(data=levels, x='level', order=valid_levels, palette='viridis', ax=ax)
+        ax.set_title("Skill Distribution of Goals")
+
+    show_figure(draw_levels, filtered_df[['level']], figsize=(10, 6))
+
+end_page()
@@ -1,30 +1,28 @@
 import streamlit as st
-import pandas as pd
-import re
-from collections import Counter
-import matplotlib.pyplot as plt
-import ast
+from app.aggregates import load_aggregate
+from app.core import begin_page, dataset_version, end_page, load_dataset, stage
+from app.facets import load_course_facets
+from app.matching import load_matcher
+from app.render import show_figure
+from app.skill_matrix import demand_version, load_skill_demand
+from app.tables import pick_row, show_table
 
 # Set page config
 st.set_page_config(page_title="In-Demand Skills Explorer", layout="wide")
 
 st.title("🔍 In-Demand Skills vs Courses")
+begin_page("Task2")
 
-# Load datasets
-courses_df = pd.read_csv("app/data/courses_preprocessed.csv")
-jobs_df = pd.read_csv("app/data/jobs_preprocessed.csv")
+# Load datasets (missing 'skills' are filled in app.core)
+courses_df = load_dataset("courses")
+jobs_df = load_dataset("jobs")
 
-# Fill missing values in 'skills'
-courses_df['skills'] = courses_df['skills'].fillna('')
-jobs_df['skills'] = jobs_df['skills'].fillna('')
+# Courses and jobs as sparse skill matrices over a shared vocabulary (cached per dataset version)
+with stage("skill_demand"):
+    demand = load_skill_demand()
 
-courses_df['skills_list'] = courses_df['skills_list'].apply(ast.literal_eval)
-jobs_df['skills_list'] = jobs_df['skills_list'].apply(ast.literal_eval)
-
-# Count skill frequencies in jobs
-all_job_skills = [skill for sublist in jobs_df['skills_list'] for skill in sublist]
-skills_counter = Counter(all_job_skills)
-skills_freq_df = pd.DataFrame(skills_counter.items(), columns=['skill', 'count']).sort_values(by='count', ascending=False)
+# Skill frequencies in jobs (column sums of the job matrix), materialized by preprocess.py
+skills_freq_df = load_aggregate("job_skill_frequencies")
 
 # Top N skill slider
 top_n = st.slider("Select number of top in-demand skills to view:", 5, 30, 10)
@@ -32,104 +30,91 @@ top_skills = skills_freq_df.head(top_n)
 
 # Plot top skills
 st.subheader("📊 Top In-Demand Skills from Job Postings")
-fig, ax = plt.subplots()
-ax.bar(top_skills['skill'], top_skills['count'])
-plt.xticks(rotation=45)
-plt.xlabel("Skills")
-plt.ylabel("Frequency")
-plt.title("Top In-Demand Skills")
-st.pyplot(fig)
-
 
-# Use all job skill frequencies for scoring (not just top N)
-all_job_skills = [skill for skills_row in jobs_df['skills_list'] for skill in skills_row]
-all_skill_counts = Counter(all_job_skills)
+def draw_top_skills(ax, top_skills):
+    ax.bar(top_skills['skill'], top_skills['count'])
+    ax.tick_params(axis='x', labelrotation=45)
+    ax.set_xlabel("Skills")
+    ax.set_ylabel("Frequency")
+    ax.set_title("Top In-Demand Skills")
 
-# Create full skill_weights dict from all job data
-skill_weights = dict(all_skill_counts)
-all_demand_skills = set(skill_weights.keys())
+show_figure(draw_top_skills, top_skills)
 
-# Weighted score based on all skill frequencies
-def weighted_skill_score(skills):
-    return sum(skill_weights.get(skill, 0) for skill in skills)
 
-# Filter out only those skills which are in demand
-def filter_in_demand_skills(skills):
-    return [skill for skill in skills if skill in all_demand_skills]
+# Weighted score based on all job skill frequencies (not just top N): course matrix @ skill counts
+courses_df['in_demand_skill_score'] = demand.course_scores
+# Only those skills which are in demand
+courses_df['filtered_skills'] = demand.course_filtered_skills
 
-courses_df['in_demand_skill_score'] = courses_df['skills_list'].apply(weighted_skill_score)
-courses_df['filtered_skills'] = courses_df['skills_list'].apply(filter_in_demand_skills)
-
-# Filter to only meaningful courses
-top_courses = courses_df[courses_df['in_demand_skill_score'] > 0]
-top_courses = top_courses.sort_values(by='in_demand_skill_score', ascending=False)
+# Filter to only meaningful courses, sorted by score (positions precomputed with the scores)
+top_courses = courses_df.iloc[demand.top_courses]
+course_columns = ['partner', 'course', 'rating', 'level', 'certificatetype', 'duration', 'crediteligibility',
+                  'filtered_skills', 'in_demand_skill_score']
 
 
+# Tables are paged and sorted on the server (app.tables); top_courses changes
+# only with the skill demand model, so its sort orders are cached per version
 st.subheader("📚 Courses Matching In-Demand Skills - Sorted in order of skill score")
-st.dataframe(top_courses[['partner', 'course', 'rating', 'level','certificatetype','duration','crediteligibility','filtered_skills', 'in_demand_skill_score']].reset_index(drop=True))
+show_table(top_courses, "top_courses", version=demand_version(), columns=course_columns,
+           file_name="in_demand_courses.csv")
 
 
 st.header("📊 Filter Courses")
 
-# Skills filter
-selected_skills = st.multiselect("Skills:", options=sorted(all_demand_skills), default=[])
-
-# Partner filter
-partners = sorted(top_courses['partner'].dropna().unique())
-selected_partners = st.multiselect("Partner", partners, default=[])
+# Facet bitmaps and the sorted rating index over top_courses (cached per dataset version)
+with stage("facet_index"):
+    facets = load_course_facets()
 
-# Level filter
-levels = sorted(top_courses['level'].dropna().unique())
-selected_levels = st.multiselect("Level", levels, default=[])
+# Skills filter
+selected_skills = st.multiselect("Skills:", options=demand.demand_skills, default=[], key="skills")
+skill_mask = demand.courses_with_any(selected_skills)[demand.top_courses] if selected_skills else None
+
+# Per-value counts under the current selections, shown next to each option.
+# An empty multiselect means "all".
+facet_labels = {
+    'partner': "Partner",
+    'level': "Level",
+    'certificatetype': "Certificate Type",
+    'crediteligibility': "Credit Eligibility",
+}
+rating_bounds = facets.range_bounds()
+current = {col: st.session_state.get(f"facet_{col}", []) for col in facet_labels}
+with stage("facet_counts"):
+    counts = facets.counts(current, st.session_state.get("rating_range", rating_bounds), skill_mask)
+
+selections = {}
+for col, label in facet_labels.items():
+    selections[col] = st.multiselect(label, facets.values[col], default=[], key=f"facet_{col}",
+                                     format_func=lambda value, col=col: f"{value} ({counts[col][value]})")
 
-# Certificate Type filter
-cert_types = sorted(top_courses['certificatetype'].dropna().unique())
-selected_cert_types = st.multiselect("Certificate Type", cert_types, default=[])
+# Rating filter
+min_rating, max_rating = st.slider("Rating Range", rating_bounds[0], rating_bounds[1], rating_bounds, key="rating_range")
 
-# Credit Eligibility filter
-credit_options = sorted(top_courses['crediteligibility'].dropna().unique())
-selected_credits = st.multiselect("Credit Eligibility", credit_options, default=[])
+with stage("facet_filter"):
+    filtered_rows = facets.filter(selections, (min_rating, max_rating), skill_mask)
 
-# Rating filter
-min_rating, max_rating = st.slider(
-    "Rating Range", 
-    float(top_courses['rating'].min()), 
-    float(top_courses['rating'].max()), 
-    (float(top_courses['rating'].min()), float(top_courses['rating'].max()))
-)
-
-# If user leaves any multiselect empty, assume "all"
-if not selected_partners:
-    selected_partners = partners
-
-if not selected_levels:
-    selected_levels = levels
-
-if not selected_cert_types:
-    selected_cert_types = cert_types
-
-if not selected_credits:
-    selected_credits = credit_options
-
-
-# Apply user-selected skill filter
-if selected_skills:
-    top_courses = top_courses[top_courses['filtered_skills'].apply(
-        lambda skills: any(skill in skills for skill in selected_skills)
-    )]
-
-filtered_courses = top_courses[
-    (top_courses['partner'].isin(selected_partners)) &
-    (top_courses['level'].isin(selected_levels)) &
-    (top_courses['certificatetype'].isin(selected_cert_types)) &
-    (top_courses['crediteligibility'].isin(selected_credits)) &
-    (top_courses['rating'] >= min_rating) &
-    (top_courses['rating'] <= max_rating)
-]
-
-#     (top_courses['duration'] >= min_duration) &
-#     (top_courses['duration'] <= max_duration)
-
-# Display results
+# Display results: the matching rows of top_courses, sorted with its cached orders
 st.subheader("📚 Courses Matching In-Demand Skills")
-st.dataframe(filtered_courses[['partner', 'course', 'rating', 'level','certificatetype','duration','crediteligibility','filtered_skills', 'in_demand_skill_score']].reset_index(drop=True))
+show_table(top_courses, "filtered_courses", version=demand_version(), rows=filtered_rows, columns=course_columns,
+           file_name="filtered_courses.csv")
+
+
+st.header("🔗 Best Courses for a Job Posting")
+
+# The posting is searched by title on the server; only the matches are sent
+job = pick_row(jobs_df, "job", "Job posting:", "job_title", version=dataset_version("jobs"),
+               format_func=lambda i: f"{jobs_df['job_title'].iat[i]} ({jobs_df['company'].iat[i]})")
+if job is not None:
+    st.write("**Skills:**", ", ".join(jobs_df['skills_list'].iat[job]))
+    # Top courses of the selected job by coverage of its skills; one job against
+    # every course, so it stays cheap however many jobs there are
+    with stage("job_matches"):
+        matches = load_matcher().courses_for_jobs([job], k=5)
+    best_courses = courses_df.iloc[matches['course']][['course', 'partner', 'rating']].reset_index(drop=True)
+    best_courses['skill_coverage'] = matches['score'].round(3).to_numpy()
+    if best_courses.empty:
+        st.info("No course shares a skill with this job posting.")
+    else:
+        st.dataframe(best_courses)
+
+end_page()
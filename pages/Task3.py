@@ -1,73 +1,90 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
-from sklearn.metrics import silhouette_score
-from sklearn.decomposition import PCA
+from app.aggregates import load_aggregate
+from app.cluster_model import model_job
+from app.clustering import silhouette
+from app.core import begin_page, dataset_version, end_page, load_dataset, stage
+from app.jobs import job_result, submit_job
+from app.lazy import lazy_import
+from app.render import show_figure
 
-st.title("Student Clustering and Recommendation System")
+# seaborn is imported when first used, after the preview is shown
+sns = lazy_import("seaborn")
 
-@st.cache_data
-def load_data():
-    return pd.read_csv("app/data/3_student-mat.csv", sep=';')
+st.title("Student Clustering and Recommendation System")
+begin_page("Task3")
 
-df = load_data()
+df = load_dataset("student_mat")
 st.subheader("Raw Dataset Preview")
 st.dataframe(df.head())
 
-# Step 2: Preprocessing
-df_clean = df[['age', 'Medu', 'Fedu', 'studytime', 'failures', 'absences',
-               'G1', 'G2', 'G3', 'schoolsup', 'famsup', 'internet']].copy()
+# Step 2: Preprocessing (feature selection and yes/no mapping live in app.core)
+df_clean = load_dataset("student_mat_features")
 
-binary_map = {'yes': 1, 'no': 0}
-df_clean['schoolsup'] = df_clean['schoolsup'].map(binary_map)
-df_clean['famsup'] = df_clean['famsup'].map(binary_map)
-df_clean['internet'] = df_clean['internet'].map(binary_map)
+# Step 3: Feature Scaling, with the stored clustering model (scaler, k-means for
+# k = 1..10 and PCA). It is updated with appended students, not refitted per run.
+# A full fit runs as a background job shared by every session; until it is
+# done the elbow curve fills in as each k finishes.
+def draw_partial_elbow(points):
+    st.line_chart(pd.Series(dict(points), name="SSE (Inertia)").sort_index())
 
-# Step 3: Feature Scaling
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(df_clean)
+st.subheader("Elbow Method for Optimal k")
+with stage("cluster_model"):
+    model = job_result("student_mat_model", model_job("student_mat"), partial=draw_partial_elbow)
+if model is None:
+    end_page()
+    st.stop()
+X_scaled = model.transform(df_clean.to_numpy(dtype=float))
+st.caption(f"Clustering model v{model.version}, trained on {model.n_rows:,} students.")
 
 # Step 4: Elbow Method
-sse = []
-for k in range(1, 11):
-    km = KMeans(n_clusters=k, random_state=42)
-    km.fit(X_scaled)
-    sse.append(km.inertia_)
+with stage("inertia"):
+    sse = [model.inertia(X_scaled, k) for k in range(1, 11)]
 
-st.subheader("Elbow Method for Optimal k")
-fig1, ax1 = plt.subplots(figsize=(7, 4))
-ax1.plot(range(1, 11), sse, marker='o')
-ax1.set_xlabel("Number of Clusters")
-ax1.set_ylabel("SSE (Inertia)")
-ax1.grid(True)
-st.pyplot(fig1)
+# Each figure is rendered once per fingerprint of its data and served from the render cache
+def draw_elbow(ax, sse):
+    ax.plot(range(1, 11), sse, marker='o')
+    ax.set_xlabel("Number of Clusters")
+    ax.set_ylabel("SSE (Inertia)")
+    ax.grid(True)
+
+show_figure(draw_elbow, np.array(sse), figsize=(7, 4))
 
 # Step 5: Clustering
 k = st.slider("Select number of clusters", 2, 10, 4)
-kmeans = KMeans(n_clusters=k, random_state=42)
-df_clean['Cluster'] = kmeans.fit_predict(X_scaled)
+labels = model.predict(X_scaled, k)
+df_clean['Cluster'] = labels
 
 # Step 6: PCA
-pca = PCA(n_components=2)
-reduced = pca.fit_transform(X_scaled)
+with stage("pca"):
+    reduced = model.project(X_scaled)
 df_clean['PCA1'] = reduced[:, 0]
 df_clean['PCA2'] = reduced[:, 1]
 
 st.subheader("PCA Cluster Visualization")
-fig2, ax2 = plt.subplots(figsize=(7, 5))
-sns.scatterplot(data=df_clean, x='PCA1', y='PCA2', hue='Cluster', palette='tab10', ax=ax2)
-st.pyplot(fig2)
 
-# Step 7: Silhouette Score
-score = silhouette_score(X_scaled, df_clean['Cluster'])
-st.write("Silhouette Score:", round(score, 4))
+def draw_pca(ax, points):
+    sns.scatterplot(data=points, x='PCA1', y='PCA2', hue='Cluster', palette='tab10', ax=ax)
 
-# Step 8: Cluster Academic Summary
-cluster_summary = df_clean.groupby('Cluster')[['G1', 'G2', 'G3', 'studytime', 'failures']].mean()
+show_figure(draw_pca, df_clean[['PCA1', 'PCA2', 'Cluster']], figsize=(7, 5))
+
+# Step 7: Silhouette Score, in the background: moving the slider while it
+# runs cancels it, unless another session is waiting for the same k; so does
+# the progress panel's Cancel button
+def silhouette_job(job, X_scaled, labels):
+    return silhouette(X_scaled, labels, progress=job.report)
+
+with stage("silhouette"):
+    job = submit_job(("silhouette", dataset_version("student_mat_features"), model.version, k),
+                     silhouette_job, X_scaled, labels, label=f"Silhouette score for k = {k}")
+    score = job_result("silhouette", job)
+if score is not None:
+    st.write("Silhouette Score:", round(score, 4))
+
+# Step 8: Cluster Academic Summary (per k, materialized by preprocess.py for
+# the current data and model version)
+cluster_summary = load_aggregate("cluster_summary", k=k)
 st.subheader("Cluster Academic Summary")
 st.dataframe(cluster_summary)
 
@@ -81,25 +98,33 @@ for cluster_id, row in cluster_summary.iterrows():
 
 # Step 10: Visualizations
 st.subheader("Grade Distribution per Cluster")
-fig3, ax3 = plt.subplots(figsize=(7, 4))
-sns.boxplot(x='Cluster', y='G3', data=df_clean, ax=ax3)
-st.pyplot(fig3)
+
+def draw_grades(ax, grades):
+    sns.boxplot(x='Cluster', y='G3', data=grades, ax=ax)
+
+show_figure(draw_grades, df_clean[['Cluster', 'G3']], figsize=(7, 4))
 
 st.subheader("Student Count per Cluster")
-fig4, ax4 = plt.subplots(figsize=(6, 4))
-sns.countplot(x='Cluster', data=df_clean, ax=ax4)
-st.pyplot(fig4)
+
+def draw_cluster_counts(ax, clusters):
+    sns.countplot(x='Cluster', data=clusters, ax=ax)
+
+show_figure(draw_cluster_counts, df_clean[['Cluster']], figsize=(6, 4))
 
 st.subheader("Cluster-wise Feature Heatmap")
-cluster_features = df_clean.groupby('Cluster')[df_clean.columns[:-4]].mean()
-fig5, ax5 = plt.subplots(figsize=(10, 6))
-sns.heatmap(cluster_features, annot=True, cmap="YlGnBu", ax=ax5)
-st.pyplot(fig5)
+cluster_features = load_aggregate("cluster_features", k=k)
+
+def draw_cluster_features(ax, cluster_features):
+    sns.heatmap(cluster_features, annot=True, cmap="YlGnBu", ax=ax)
+
+show_figure(draw_cluster_features, cluster_features, figsize=(10, 6))
 
 st.subheader("Feature Correlation Matrix")
-fig6, ax6 = plt.subplots(figsize=(10, 7))
-sns.heatmap(df_clean.corr(), cmap='coolwarm', annot=True, ax=ax6)
-st.pyplot(fig6)
+
+def draw_correlation(ax, df_clean):
+    sns.heatmap(df_clean.corr(), cmap='coolwarm', annot=True, ax=ax)
+
+show_figure(draw_correlation, df_clean, figsize=(10, 7))
 
 # Optional Labels
 df_clean['Cluster_Label'] = df_clean['Cluster'].map({
@@ -110,7 +135,11 @@ df_clean['Cluster_Label'] = df_clean['Cluster'].map({
 })
 
 st.subheader("Cluster Label Distribution")
-fig7, ax7 = plt.subplots(figsize=(6, 4))
-sns.countplot(data=df_clean, x='Cluster_Label', ax=ax7)
-plt.xticks(rotation=45)
-st.pyplot(fig7)
+
+def draw_labels(ax, labels):
+    sns.countplot(data=labels, x='Cluster_Label', ax=ax)
+    ax.tick_params(axis='x', labelrotation=45)
+
+show_figure(draw_labels, df_clean[['Cluster_Label']], figsize=(6, 4))
+
+end_page()
@@ -2,118 +2,135 @@
 
 import streamlit as st
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.preprocessing import StandardScaler
-from sklearn.decomposition import PCA
-from sklearn.cluster import KMeans
 import warnings
+from app.aggregates import load_aggregate
+from app.cluster_model import model_job
+from app.core import begin_page, dataset_version, end_page, stage
+from app.jobs import job_result
+from app.lazy import lazy_import
+from app.render import is_large, plot_rows, show_figure, show_grid
+from app.struggles import DEFAULT_THRESHOLDS, SUBJECTS, load_struggles
+from app.tables import show_table
 warnings.filterwarnings("ignore")
 
+# Imported by the section that first uses it
+sns = lazy_import("seaborn")
+
 st.set_page_config(page_title="📊 Student Performance Clustering", layout="wide")
 st.title("📈 Student Struggles and Adaptive Learning Insights")
+begin_page("Task4")
 
-@st.cache_data
-def load_data():
-    df = pd.read_csv("app/data/StudentsPerformance.csv")
-    df.columns = [col.lower().replace(" ", "_") for col in df.columns]
-    return df
-
-df = load_data()
-
-# Add calculated fields
 score_columns = ['math_score', 'reading_score', 'writing_score']
 
-def identify_struggles(row):
-    struggles = []
-    if row['math_score'] < 60: struggles.append('Math')
-    if row['reading_score'] < 60: struggles.append('Reading')
-    if row['writing_score'] < 60: struggles.append('Writing')
-    return struggles
-
-def recommend_resources(subjects):
-    resources = []
-    for subject in subjects:
-        if subject == 'Math':
-            resources.append("Khan Academy - Math Basics")
-        elif subject == 'Reading':
-            resources.append("Coursera - Reading Comprehension")
-        elif subject == 'Writing':
-            resources.append("edX - Academic Writing Essentials")
-    return resources if resources else ["Advanced Learning Track"]
-
-df['struggling_subjects'] = df.apply(identify_struggles, axis=1)
-df['struggle_count'] = df['struggling_subjects'].apply(len)
-df['recommended_resources'] = df['struggling_subjects'].apply(recommend_resources)
+# Struggle thresholds are configurable; detection and recommendations are vectorized in app.struggles
+with st.sidebar.expander("Struggle thresholds"):
+    thresholds = {
+        col: st.number_input(f"{SUBJECTS[col]} below", 0, 100, DEFAULT_THRESHOLDS[col], key=f"threshold_{col}")
+        for col in score_columns
+    }
+with stage("struggles"):
+    df = load_struggles(thresholds)
 
 # Tabs
 tab1, tab2, tab3, tab4 = st.tabs(["Overview", "Visual Insights", "Clustering", "Recommendations"])
 
 with tab1:
     st.subheader("📌 Dataset Snapshot")
-    st.dataframe(df.head(10))
+    show_table(df, "students", version=(dataset_version("students_performance"), tuple(sorted(thresholds.items()))),
+               page_size=10, file_name="students.csv")
     st.write("Shape:", df.shape)
-    st.write("Missing Values:", df.isnull().sum().sum())
+    # Summaries for the default thresholds are materialized by preprocess.py;
+    # other thresholds are computed once per process
+    with stage("summary_aggregates"):
+        missing_values = load_aggregate("missing_values", dataset="students_performance")
+        statistics = load_aggregate("struggle_statistics", thresholds=thresholds)
+    st.write("Missing Values:", missing_values)
 
     st.markdown("### 📊 Summary Statistics")
-    st.dataframe(df.describe())
+    st.dataframe(statistics)
 
 with tab2:
     st.subheader("📉 Score Distributions")
+
+    # Each figure is rendered once per fingerprint of its data and served from the render cache
+    def draw_distribution(ax, scores):
+        sns.histplot(scores, kde=True, ax=ax)
+        ax.set_title(f'{scores.name.capitalize()} Distribution')
+
     for col in score_columns:
         st.markdown(f"**{col.replace('_', ' ').title()}**")
-        fig, ax = plt.subplots()
-        sns.histplot(df[col], kde=True, ax=ax)
-        ax.set_title(f'{col.capitalize()} Distribution')
-        st.pyplot(fig)
+        show_figure(draw_distribution, df[col])
 
     st.markdown("### 🚨 Subjects Where Students Struggle")
     all_struggles = df['struggling_subjects'].explode().dropna()
     struggle_df = pd.DataFrame({'subject': all_struggles})
-    fig, ax = plt.subplots()
-    sns.countplot(data=struggle_df, x='subject', ax=ax)
-    ax.set_title("Subjects Where Students Struggle Most")
-    st.pyplot(fig)
 
-    st.markdown("### 📦 Struggle Count by Gender")
-    fig, ax = plt.subplots()
-    sns.boxplot(x='gender', y='struggle_count', data=df, ax=ax)
-    ax.set_title("Struggle Count by Gender")
-    st.pyplot(fig)
+    def draw_struggles(ax, struggle_df):
+        sns.countplot(data=struggle_df, x='subject', ax=ax)
+        ax.set_title("Subjects Where Students Struggle Most")
 
-with tab3:
-    st.subheader("🧠 Clustering Students Based on Scores")
+    show_figure(draw_struggles, struggle_df)
+
+    st.markdown("### 📦 Struggle Count by Gender")
 
-    X = df[score_columns]
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
+    def draw_struggles_by_gender(ax, struggles):
+        sns.boxplot(x='gender', y='struggle_count', data=struggles, ax=ax)
+        ax.set_title("Struggle Count by Gender")
 
-    kmeans = KMeans(n_clusters=3, random_state=42)
-    df['cluster'] = kmeans.fit_predict(X_scaled)
+    show_figure(draw_struggles_by_gender, df[['gender', 'struggle_count']])
 
-    st.markdown("### 📊 Score Cluster Overview")
-    fig = sns.pairplot(df, hue="cluster", vars=score_columns)
-    st.pyplot(fig)
+with tab3:
+    st.subheader("🧠 Clustering Students Based on Scores")
 
-    st.markdown("### 🔍 PCA Visualization of Clusters")
-    pca = PCA(n_components=2)
-    X_pca = pca.fit_transform(X_scaled)
-    df['pca1'] = X_pca[:, 0]
-    df['pca2'] = X_pca[:, 1]
-    fig, ax = plt.subplots()
-    sns.scatterplot(x='pca1', y='pca2', hue='cluster', data=df, palette="Set2", legend=False, ax=ax)
-    ax.set_title("PCA of Student Clusters")
-    st.pyplot(fig)
+    # Stored scaler, k-means and PCA, updated with appended students instead of
+    # refitted per run; a full fit runs as a background job while the other
+    # tabs stay usable
+    with stage("kmeans"):
+        model = job_result("students_performance_model", model_job("students_performance"))
+    if model is not None:
+        X_scaled = model.transform(df[score_columns].to_numpy(dtype=float))
+        df['cluster'] = model.predict(X_scaled, 3)
+        st.caption(f"Clustering model v{model.version}, trained on {model.n_rows:,} students.")
+
+        st.markdown("### 📊 Score Cluster Overview")
+
+        # Above the large-data threshold the off-diagonal panels become 2D
+        # histograms over all rows. A new grid is drawn in the background.
+        def draw_pairplot(scores, kind):
+            return sns.pairplot(scores, hue="cluster", vars=score_columns, kind=kind,
+                                diag_kind="hist" if kind == "hist" else "auto")
+
+        pair_kind = "hist" if is_large(df) else "scatter"
+        if pair_kind == "hist":
+            st.caption(f"Large-data mode: {len(df):,} rows drawn as binned 2D histograms instead of points.")
+        show_grid(draw_pairplot, df[score_columns + ['cluster']], kind=pair_kind, background=True)
+
+        st.markdown("### 🔍 PCA Visualization of Clusters")
+        with stage("pca"):
+            X_pca = model.project(X_scaled)
+        df['pca1'] = X_pca[:, 0]
+        df['pca2'] = X_pca[:, 1]
+
+        def draw_pca(ax, points):
+            sns.scatterplot(x='pca1', y='pca2', hue='cluster', data=points, palette="Set2", legend=False, ax=ax)
+            ax.set_title("PCA of Student Clusters")
+
+        pca_points, note = plot_rows(df[['pca1', 'pca2', 'cluster']], by='cluster')
+        if note:
+            st.caption(note)
+        show_figure(draw_pca, pca_points)
 
 with tab4:
     st.subheader("📚 Learning Recommendations")
 
     st.markdown("### 📈 Average Scores by Struggle Count")
-    avg_by_struggle = df.groupby("struggle_count")[score_columns].mean().round(1)
+    with stage("avg_by_struggle"):
+        avg_by_struggle = load_aggregate("struggle_means", thresholds=thresholds)
     st.dataframe(avg_by_struggle)
 
     st.markdown("### 🧾 Sample Recommendations")
-    st.dataframe(df[["math_score", "reading_score", "writing_score", 
-                     "struggling_subjects", "recommended_resources", "cluster"]].head(10))
+    # The cluster column is missing while the clustering model is being fitted
+    st.dataframe(df[["math_score", "reading_score", "writing_score", "struggling_subjects",
+                     "recommended_resources"] + [col for col in ["cluster"] if col in df]].head(10))
 
+end_page()
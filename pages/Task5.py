@@ -1,26 +1,25 @@
 # pages/Task5.py
 
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-import os
+from app.career_cube import dimension_values, load_career_cube, rollup
+from app.core import begin_page, end_page, load_dataset, stage
+from app.lazy import lazy_import
+from app.render import plot_rows
+
+# plotly is imported by the first chart drawn
+px = lazy_import("plotly.express")
+go = lazy_import("plotly.graph_objects")
 
 st.set_page_config(page_title="Career Pathway Visualization", layout="wide")
 st.title("🚀 Employee Success Stories & Career Pathways")
+begin_page("Task5")
 
-@st.cache_data
-def load_data():
-    file_path = os.path.join("app", "data", "4_Employee_HR-Employee-Attrition-dataset.csv")
-    df = pd.read_csv(file_path)
-    return df
-
-df = load_data()
-
-# Basic preprocessing
-df_clean = df.drop(columns=['EmployeeCount', 'Over18', 'StandardHours', 'EmployeeNumber'])
-df_clean['TotalWorkingYears'] = df_clean['TotalWorkingYears'].replace(0, df_clean['TotalWorkingYears'].median())
-df_clean['EstimatedGraduationAge'] = df_clean['Age'] - df_clean['TotalWorkingYears']
+# Basic preprocessing (drop + median fill) is done once per process in app.core
+df_clean = load_dataset("hr_clean")
+# Counts and income stats per (Department, EducationField, JobRole, Education),
+# built once per dataset version; the summary charts are slices of it
+with stage("career_cube"):
+    cube = load_career_cube()
 
 # Tabs
 tab1, tab2, tab3, tab4 = st.tabs(["Career Timelines", "Education Path Mapping", "Income vs Education", "Department Insights"])
@@ -28,36 +27,52 @@ tab1, tab2, tab3, tab4 = st.tabs(["Career Timelines", "Education Path Mapping",
 with tab1:
     selected_roles = st.multiselect(
         "Select Job Roles for Career Timeline",
-        options=df_clean['JobRole'].unique(),
+        options=dimension_values(cube, 'JobRole'),
         default=['Research Scientist', 'Sales Executive']
     )
 
     st.subheader("📌 Career Timelines of Sample Employees")
-    sample_employees = df_clean[df_clean['JobRole'].isin(selected_roles)].head(10)
-
-
-    fig = go.Figure()
-    for _, row in sample_employees.iterrows():
-        fig.add_trace(go.Bar(
-            x=[row['YearsAtCompany']],
-            y=[f"{row['JobRole']} ({row['Age']} yrs)"],
+    with stage("timeline_sample"):
+        sample_employees = df_clean[df_clean['JobRole'].isin(selected_roles)].head(10)
+
+
+    # One bar trace per role, so the legend names the colours; repeated
+    # labels get a counter so bars never share a category
+    roles = sample_employees['JobRole'].astype(str)
+    labels = roles + " (" + sample_employees['Age'].astype(str) + " yrs)"
+    repeat = labels.groupby(labels).cumcount()
+    labels = labels.where(repeat == 0, labels + " #" + (repeat + 1).astype(str))
+    palette = px.colors.qualitative.Plotly
+    hovertext = ("Role: " + roles
+                 + "<br>EducationField: " + sample_employees['EducationField'].astype(str)
+                 + "<br>TotalWorkingYears: " + sample_employees['TotalWorkingYears'].astype(str))
+
+    fig = go.Figure([
+        go.Bar(
+            x=sample_employees['YearsAtCompany'][roles == role],
+            y=labels[roles == role],
             orientation='h',
-            name=row['JobRole'],
-            hovertext=f"Role: {row['JobRole']}<br>EducationField: {row['EducationField']}<br>TotalWorkingYears: {row['TotalWorkingYears']}"
-        ))
-
-    
+            name=role,
+            marker_color=palette[i % len(palette)],
+            hovertext=hovertext[roles == role],
+        )
+        for i, role in enumerate(selected_roles) if (roles == role).any()
+    ])
     fig.update_layout(
         title="Career Timelines of Sample Employees",
         xaxis_title="Years at Company",
         yaxis_title="Employee (JobRole - Age)",
+        # Employees stay in row order rather than grouped by trace
+        yaxis={'categoryorder': 'array', 'categoryarray': labels.tolist()},
+        legend_title_text="Job Role",
+        showlegend=True,
         height=500
     )
     st.plotly_chart(fig, use_container_width=True)
 
 with tab2:
     st.subheader("📚 Mapping Education Fields to Job Roles")
-    edu_job_df = df_clean.groupby(['EducationField', 'JobRole']).size().reset_index(name='count')
+    edu_job_df = rollup(cube, ['EducationField', 'JobRole'], sort=True)
 
     fig = px.sunburst(
         edu_job_df,
@@ -69,8 +84,13 @@ with tab2:
 
 with tab3:
     st.subheader("📊 Education Level vs Monthly Income")
+    # Large exports are plotted from a sample stratified by JobRole
+    with stage("scatter_sample"):
+        scatter_rows, note = plot_rows(df_clean, by='JobRole')
+    if note:
+        st.caption(note)
     fig = px.scatter(
-        df_clean,
+        scatter_rows,
         x='Education',
         y='MonthlyIncome',
         color='JobRole',
@@ -80,19 +100,36 @@ with tab3:
     )
     st.plotly_chart(fig, use_container_width=True)
 
+    income_df = rollup(cube, ['Education', 'JobRole'], sort=True)
+    fig = px.line(
+        income_df,
+        x='Education',
+        y='income_mean',
+        color='JobRole',
+        markers=True,
+        hover_data={'count': True, 'income_min': ':.0f', 'income_max': ':.0f', 'income_std': ':.0f'},
+        labels={'income_mean': 'Mean MonthlyIncome'},
+        title="Mean Monthly Income per Education Level"
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
 with tab4:
     selected_department = st.selectbox(
         "Select Department for Education vs Roles",
-        options=df_clean['Department'].unique()
+        options=dimension_values(cube, 'Department')
     )
     st.subheader(f"🏢 Job Roles vs Education Fields in {selected_department}")
-    dept_df = df_clean[df_clean['Department'] == selected_department]
+    with stage("department_rollup"):
+        dept_df = rollup(cube, ['JobRole', 'EducationField'], where={'Department': selected_department})
 
-    fig = px.histogram(
+    fig = px.bar(
         dept_df,
         x='JobRole',
+        y='count',
         color='EducationField',
         title=f'Job Roles vs Education Fields in {selected_department} Department',
         barmode='group'
     )
     st.plotly_chart(fig, use_container_width=True)
+
+end_page()
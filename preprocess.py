@@ -1,28 +1,311 @@
+import argparse
+import hashlib
+import json
+import os
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 import re
-from collections import Counter
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
 
-# Load data
-courses_df = pd.read_csv("app/data/1_courses.csv")
-jobs_df = pd.read_csv("app/data/2_jobs.csv")
-
-courses_df['skills'] = courses_df['skills'].fillna('')
-jobs_df['skills'] = jobs_df['skills'].fillna('')
+from app.storage import DATA_DIR, SHARED_DIR, read_skills_artifact, skills_artifact_path
 
 # Use full skill_list here (shortened for example)
 # skill_list = ['python', 'sql', 'excel', 'machine learning', 'data science', 'cloud', 'java', 'react', 'project management', 'linux']
 skill_list = ['cloud', 'social media', 'html', 'css', 'javascript', 'react', 'angular', 'network security', 'java', 'python', 'sql', 'nosql', 'django', 'swift', 'jira', 'salesforce', 'power bi', 'tableau', 'azure', 'docker', 'kubernetes', 'sas', 'postgresql', 'linux', 'cloud computing', 'ibm cloud', 'machine learning', 'deep learning', 'neural networks', 'natural language processing', 'computer vision', 'reinforcement learning', 'data science', 'big data', 'data mining', 'data visualization', 'r programming', 'matlab', 'statistics', 'project management', 'agile', 'scrum', 'risk management', 'change management', 'devops', 'continuous integration', 'business analysis', 'business intelligence', 'strategy', 'marketing', 'finance', 'operations management', 'supply chain', 'leadership', 'negotiation', 'communication', 'problem solving', 'critical thinking', 'adaptability', 'creativity', 'emotional intelligence', 'data structures', 'algorithms', 'networking', 'network architecture', 'blockchain', 'internet of things', 'virtual reality', 'feature engineering', 'continuous delivery', 'c', 'data engineering', 'data warehousing', 'product management', 'market research', 'digital marketing', 'brand management', 'decision making', 'user research', 'looker', 'fintech', 'api', 'bi', 'networking hardware', 'accounting software', 'technical product management', 'web frameworks', 'computer security', 'incident management', 'forecasting', 'programming principles', 'shipping and receiving', 'computer networking', 'excel', 'financial management', 'software security', 'corporate accouting', 'business research', 'data analysis software', 'software architecture', 'cryptography', 'customer support', 'machine learning algorithms', 'media strategy & planning', 'computer security models', 'cyberattacks', 'securities trading', 'collaboration', 'theoretical computer science', 'graph theory', 'storytelling', 'security engineering', 'arcgis', 'software engineering', 'database application', 'exploratory data analysis', 'database theory', 'differential equations', 'microsoft azure', 'google app engine', 'scala programming', 'influencing', 'gis software', 'c++ programming', 'cloud-based integration', 'linear algebra', 'software-defined networking', 'c programming language family', 'software engineering tools', 'supply chain and logistics', 'basic descriptive statistics', 'java programming', 'advertising sales', 'computer programming tools', 'python programming', 'people analysis', 'product marketing', 'resilience', 'software visualization', 'combinatorics', 'data management', 'search engine optimization', 'performance management', 'other programming languages', 'probability & statistics', 'information technology', 'transportation operations management', 'other cloud platforms and tools', 'html and css', 'cloud infrastructure', 'talent management', 'entrepreneurship', 'market analysis', 'management accounting', 'human resources', 'computer architecture', 'game theory', 'tensorflow', 'mobile development tools', 'geometry', 'apache', 'recruitment', 'business design', 'data architecture', 'cloud management', 'product lifecycle', 'probability distribution', 'customer success', 'accounting', 'semantic web', 'supply chain systems', 'cloud engineering', 'tableau software', 'customer relationship management', 'organizational development', 'spatial analysis', 'human resources operations', 'knitr', 'geovisualization', 'system software', 'security strategy', 'mathematical theory & analysis', 'database administration', 'back-end web development', 'application development', 'bayesian network', 'process analysis', 'mergers & acquisitions', 'artificial neural networks', 'statistical analysis', 'survey creation', 'markov model', 'culture', 'small data', 'hardware design', 'regression', 'correlation and dependence', 'operations research', 'cloud load balancing', 'cloud api', 'design and product', 'journalism', 'financial analysis', 'computer graphics', 'planning', 'human learning', 'cash management', 'human computer interaction', 'computer graphic techniques', 'system security', 'procurement', 'general accounting', 'full-stack web development', 'graphic design', 'data analysis', 'people development', 'cloud clients', 'mathematics', 'inventory management', 'business development', 'cloud applications', 'entrepreneurial finance', 'web development tools', 'front-end web development', 'taxes', 'merchandising', 'software as a service', 'statistical tests', 'bioinformatics', 'b2b sales', 'budget management', 'contract management', 'computer science', 'marketing psychology', 'material handling', 'cloud standards', 'computational thinking', 'professional development', 'visual design', 'payments', 'security software', 'algebra', 'writing', 'product development', 'benefits', 'web design', 'persona research', 'marketing management', 'conflict management', 'computer programming', 'sales', 'databases', 'strategy and operations', 'employee relations', 'agile software development', 'public relations', 'database design', 'hr tech', 'business transformation', 'audit', 'banking', 'research and design', 'media production', 'data model', 'devops tools', 'cross platform development', 'mobile development', 'business communication', 'scientific visualization', 'behavioral economics', 'experiment', 'network analysis', 'dimensionality reduction', 'training', 'cloud platforms', 'cost accounting', 'e-commerce', 'innovation', 'financial accounting', 'marketing design', 'accounts payable and receivable', 'google cloud platform', 'graphics software', 'ios development', 'securities sales', 'interactive data visualization', 'spreadsheet software', 'retail store operations', 'product strategy', 'machine learning software', 'prospecting and qualification', 'clinical data management', 'epidemiology', 'calculus', 'interactive design', 'billing & invoicing', 'supplier relationship management', 'operational analysis', 'inside sales', 'microarchitecture', 'statistical machine learning', 'business process management', 'user experience design', 'operating systems', 'applied machine learning', 'advertising', 'user experience', 'spatial data analysis', 'android development', 'regulations and compliance', 'systems design', 'applied mathematics', 'statistical visualization', 'econometrics', 'investment management', 'computational logic', 'mobile security', 'leadership development', 'leadership and management', 'product design', 'warehouse management', 'biostatistics', 'business psychology', 'system programming', 'distributed computing architecture', 'swift programming', 'compensation', 'network model', 'estimation', 'cloud storage', 'general statistics', 'customer analysis', 'people management', 'software testing', 'geostatistics', 'bayesian statistics', 'statistical programming', 'retail sales', 'account management', 'amazon web services', 'web development', 'data visualization software', 'sales systems', 'insurance sales']
 
 
+def _is_word_char(ch):
+    # Same notion of a word character as the regex engine uses for \b
+    return ch.isalnum() or ch == '_'
+
+
+def _trie_pattern(node):
+    # Turn a trie of characters into nested regex groups; a node that ends a skill
+    # makes the rest optional (greedy), so the longest skill is tried first
+    branches = [re.escape(ch) + _trie_pattern(child) for ch, child in sorted(node.items()) if ch]
+    if not branches:
+        return ''
+    body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    return '(?:' + body + ')?' if '' in node else body
+
+
+def build_skill_matcher(skills):
+    r"""Compile the skill vocabulary once and return a function that finds every
+    skill in a (lowercased) string in a single regex pass.
+
+    Matches are identical to checking each skill with r'\b<skill>\b': the
+    pattern finds the longest skill starting at each word boundary, and the
+    shorter skills that are also prefixes of it ('cloud' inside
+    'cloud computing') are added from a precomputed table.
+    """
+    trie = {}
+    for skill in skills:
+        node = trie
+        for ch in skill:
+            node = node.setdefault(ch, {})
+        node[''] = True
+    pattern = re.compile(r'(?=\b(' + _trie_pattern(trie) + r')\b)')
+
+    index = {skill: i for i, skill in enumerate(skills)}
+    implied = []
+    for skill in skills:
+        implied.append([
+            index[skill[:end]] for end in range(1, len(skill))
+            if skill[:end] in index and _is_word_char(skill[end - 1]) != _is_word_char(skill[end])
+        ])
+
+    def match(text):
+        found = set()
+        for m in pattern.finditer(text):
+            i = index[m.group(1)]
+            found.add(i)
+            found.update(implied[i])
+        return [skills[i] for i in sorted(found)]
+
+    return match
+
+
+_match_skills = build_skill_matcher(skill_list)
+
+
 def parse_skills(skills_str):
-    return [skill for skill in skill_list if re.search(r'\b' + re.escape(skill) + r'\b', skills_str.lower())]
+    return _match_skills(skills_str.lower())
+
+
+INPUTS = [
+    (os.path.join(DATA_DIR, "1_courses.csv"), os.path.join(DATA_DIR, "courses_preprocessed.csv")),
+    (os.path.join(DATA_DIR, "2_jobs.csv"), os.path.join(DATA_DIR, "jobs_preprocessed.csv")),
+]
+
+# Manifest of input hashes plus one row-hash file per output, used to skip
+# unchanged inputs and to re-parse only new or edited rows
+CACHE_DIR = os.path.join(DATA_DIR, ".preprocess_cache")
+MANIFEST_PATH = os.path.join(CACHE_DIR, "manifest.json")
+
+# skills_list is also written as a typed list<string> column so the pages can
+# memory-map it instead of running ast.literal_eval on the CSV repr
+SKILLS_SCHEMA = pa.schema([('skills_list', pa.list_(pa.string()))])
+
+
+def vocabulary_hash(skills):
+    return hashlib.sha256(json.dumps(skills).encode("utf-8")).hexdigest()
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def row_hashes(skills):
+    # One uint64 per row of the skills text, which is all parse_skills depends on
+    return pd.util.hash_pandas_object(skills, index=False).to_numpy()
+
+
+def _rowhash_path(dst):
+    return os.path.join(CACHE_DIR, os.path.basename(dst) + ".rowhash.npy")
+
+
+def load_manifest():
+    if not os.path.exists(MANIFEST_PATH):
+        return {}
+    with open(MANIFEST_PATH) as f:
+        return json.load(f)
+
+
+def save_manifest(manifest):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = MANIFEST_PATH + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, MANIFEST_PATH)
+
+
+def _skills_batch(skills_lists):
+    return pa.record_batch([pa.array(skills_lists, type=SKILLS_SCHEMA.field('skills_list').type)],
+                           schema=SKILLS_SCHEMA)
+
+
+def write_skills_artifact(path, skills_lists):
+    tmp = path + ".tmp"
+    with pa.OSFile(tmp, 'wb') as sink, pa.ipc.new_file(sink, SKILLS_SCHEMA) as writer:
+        writer.write_batch(_skills_batch(skills_lists))
+    os.replace(tmp, path)
+
+
+def load_previous(dst):
+    # skills_list of the existing output keyed by row hash, or None if the
+    # output artifact and its row hashes are missing or out of step
+    path = _rowhash_path(dst)
+    if not (os.path.exists(dst) and os.path.exists(path)):
+        return None
+    hashes = np.load(path)
+    skills = read_skills_artifact(dst)
+    if skills is None or len(hashes) != len(skills):
+        return None
+    previous = pd.Series(skills.to_pylist(), index=hashes, dtype=object)
+    return previous[~previous.index.duplicated()]
+
+
+def preprocess_file(src, dst, previous=None):
+    df = pd.read_csv(src)
+    df['skills'] = df['skills'].fillna('')
+    hashes = row_hashes(df['skills'])
+
+    # Reuse the stored skills_list for rows whose skills text was parsed
+    # before, and parse only the rest
+    if previous is not None:
+        skills_list = pd.Series(previous.reindex(hashes).to_numpy(), index=df.index, dtype=object)
+    else:
+        skills_list = pd.Series(np.nan, index=df.index, dtype=object)
+    todo = skills_list.isna()
+    skills_list[todo] = df.loc[todo, 'skills'].apply(parse_skills)
+    df['skills_list'] = skills_list
+
+    # Through a temporary file: a running app may be reading dst
+    df.to_csv(dst + ".tmp", index=False)
+    os.replace(dst + ".tmp", dst)
+    write_skills_artifact(skills_artifact_path(dst), skills_list.tolist())
+    print(f"{src}: parsed {int(todo.sum())} of {len(df)} rows")
+    return hashes
+
+
+def _parse_chunk(skills):
+    return [parse_skills(s) for s in skills]
+
+
+def preprocess_file_streaming(src, dst, chunksize=50000, workers=None):
+    # Read the input in chunks and parse them on a process pool. At most
+    # 2 * workers chunks are in flight, so memory is bounded by the chunk size,
+    # and results are written as soon as the oldest chunk is done, in input order.
+    # Every column is read as text so no chunk infers a different dtype.
+    workers = workers or os.cpu_count() or 1
+    tmp = dst + ".tmp"
+    artifact = skills_artifact_path(dst)
+    header = True
+    pending = deque()
+    hashes = []
+
+    def write_oldest():
+        nonlocal header
+        chunk, future = pending.popleft()
+        chunk['skills_list'] = future.result()
+        chunk.to_csv(tmp, mode='w' if header else 'a', header=header, index=False)
+        writer.write_batch(_skills_batch(chunk['skills_list'].tolist()))
+        header = False
+
+    with pa.OSFile(artifact + ".tmp", 'wb') as sink, pa.ipc.new_file(sink, SKILLS_SCHEMA) as writer, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        reader = pd.read_csv(src, chunksize=chunksize, dtype=str, keep_default_na=False)
+        for chunk in reader:
+            hashes.append(row_hashes(chunk['skills']))
+            pending.append((chunk, pool.submit(_parse_chunk, chunk['skills'].tolist())))
+            if len(pending) >= 2 * workers:
+                write_oldest()
+        while pending:
+            write_oldest()
+
+    if header:
+        # Empty input: still produce a file with the header row
+        pd.read_csv(src, nrows=0).assign(skills_list=[]).to_csv(tmp, index=False)
+    os.replace(tmp, dst)
+    os.replace(artifact + ".tmp", artifact)
+    hashes = np.concatenate(hashes) if hashes else np.array([], dtype=np.uint64)
+    print(f"{src}: parsed {len(hashes)} of {len(hashes)} rows")
+    return hashes
+
+
+def _is_unchanged(entry, src, dst):
+    # Cheap size/mtime check first; fall back to the content hash when only
+    # the timestamps moved
+    if not entry or not os.path.exists(dst) or not os.path.exists(skills_artifact_path(dst)):
+        return False
+    out = os.stat(dst)
+    if [out.st_size, out.st_mtime_ns] != entry['output_stat']:
+        return False
+    stat = os.stat(src)
+    if [stat.st_size, stat.st_mtime_ns] == entry['input_stat']:
+        return True
+    if file_hash(src) == entry['input_sha256']:
+        entry['input_stat'] = [stat.st_size, stat.st_mtime_ns]
+        return True
+    return False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract skills_list from the course and job CSVs.")
+    parser.add_argument("--stream", action="store_true",
+                        help="read inputs in chunks and parse them on a process pool")
+    parser.add_argument("--chunksize", type=int, default=50000, help="rows per chunk in --stream mode")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes in --stream mode")
+    parser.add_argument("--force", action="store_true", help="ignore the manifest and rebuild every output")
+    parser.add_argument("--publish", metavar="DIR", nargs="?", const="", default=None,
+                        help="also publish every cleaned dataset as Arrow files to DIR for workers in shared "
+                             "mode (default DIR: $APP_SHARED_DIR)")
+    parser.add_argument("--no-aggregates", action="store_true",
+                        help="do not materialize the pages' summary tables (app.aggregates)")
+    args = parser.parse_args(argv)
+    if args.publish is not None:
+        args.publish = args.publish or SHARED_DIR
+        if not args.publish:
+            parser.error("--publish needs a directory or APP_SHARED_DIR")
+
+    # Any change to skill_list invalidates every stored result
+    vocabulary = vocabulary_hash(skill_list)
+    manifest = {} if args.force else load_manifest()
+    if manifest.get('vocabulary') != vocabulary:
+        manifest = {'vocabulary': vocabulary, 'files': {}}
+
+    for src, dst in INPUTS:
+        entry = manifest['files'].get(dst)
+        if entry and entry['input'] == src and _is_unchanged(entry, src, dst):
+            print(f"{src}: unchanged, skipped")
+            continue
+
+        stat = os.stat(src)
+        digest = file_hash(src)
+        if args.stream:
+            # Streaming keeps memory bounded, so it does not hold the previous
+            # results in memory and re-parses every row of a changed file
+            hashes = preprocess_file_streaming(src, dst, chunksize=args.chunksize, workers=args.workers)
+        else:
+            previous = load_previous(dst) if entry else None
+            hashes = preprocess_file(src, dst, previous)
+
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        np.save(_rowhash_path(dst), hashes)
+        out = os.stat(dst)
+        manifest['files'][dst] = {
+            'input': src,
+            'input_sha256': digest,
+            'input_stat': [stat.st_size, stat.st_mtime_ns],
+            'output_stat': [out.st_size, out.st_mtime_ns],
+            'rows': len(hashes),
+        }
+        save_manifest(manifest)
+
+    print("Preprocessing done. Files saved.")
+
+    if args.publish:
+        # Cleaned frames for workers in shared mode, under a new version.
+        # app.core and app.aggregates import Streamlit, so only these steps
+        # load them
+        from app.core import publish_datasets
+        version = publish_datasets(args.publish)
+        print(f"Published datasets to {os.path.join(args.publish, version)}")
 
-# Precompute skills_list
-courses_df['skills_list'] = courses_df['skills'].apply(parse_skills)
-jobs_df['skills_list'] = jobs_df['skills'].apply(parse_skills)
+    if not args.no_aggregates:
+        # After publishing, so the summaries are keyed to the data the
+        # workers will load
+        from app.aggregates import AGGREGATE_DIR, materialize_aggregates
+        written, current, skipped = materialize_aggregates()
+        print(f"Aggregates: {written} written, {current} up to date, {skipped} skipped (no stored model) "
+              f"in {AGGREGATE_DIR}")
 
-# Save to new CSVs (or overwrite originals if you prefer)
-courses_df.to_csv("app/data/courses_preprocessed.csv", index=False)
-jobs_df.to_csv("app/data/jobs_preprocessed.csv", index=False)
 
-print("Preprocessing done. Files saved.")
+if __name__ == "__main__":
+    main()
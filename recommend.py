@@ -0,0 +1,92 @@
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import sys
+
+from app.recommend import MAX_K, Recommender
+
+
+def _requests(lines):
+    # (id, kind, value) per JSON line: {"id": ..., "goal": "..."} or {"id": ..., "skills": [...]}
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield number, "error", f"invalid JSON: {exc.msg}"
+            continue
+        request_id = item.get("id", number) if isinstance(item, dict) else number
+        if isinstance(item, dict) and isinstance(item.get("goal"), str):
+            yield request_id, "goal", item["goal"]
+        elif isinstance(item, dict) and isinstance(item.get("skills"), list) \
+                and all(isinstance(skill, str) for skill in item["skills"]):
+            yield request_id, "skills", item["skills"]
+        else:
+            yield request_id, "error", "expected an object with a 'goal' string or a 'skills' list of strings"
+
+def recommend_batch(recommender, batch, k, metric):
+    # One output record per input, in input order; goals and skill profiles
+    # are each scored as one batch
+    results = {}
+    for kind, method in (("goal", recommender.for_goals), ("skills", recommender.for_profiles)):
+        positions = [i for i, (_, item_kind, _) in enumerate(batch) if item_kind == kind]
+        if not positions:
+            continue
+        params = {"metric": metric} if kind == "skills" else {}
+        try:
+            courses = method([batch[i][2] for i in positions], k=k, **params)
+            results.update({i: {"courses": found} for i, found in zip(positions, courses)})
+        except ValueError as exc:
+            results.update({i: {"error": str(exc)} for i in positions})
+    return [{"id": request_id, **results.get(i, {"error": value})}
+            for i, (request_id, _, value) in enumerate(batch)]
+
+def run_batch(args):
+    recommender = Recommender()
+    source = sys.stdin if args.input == "-" else open(args.input)
+    sink = sys.stdout if args.output == "-" else open(args.output, "w")
+    requests = _requests(source)
+    with source, sink:
+        while batch := list(itertools.islice(requests, args.batch_size)):
+            for record in recommend_batch(recommender, batch, args.k, args.metric):
+                sink.write(json.dumps(record) + "\n")
+
+def run_server(args):
+    from app.service import serve
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers))
+    except KeyboardInterrupt:
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Course recommendations without the Streamlit pages.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    batch = commands.add_parser("batch", help="recommend for every line of a JSONL file")
+    batch.add_argument("input", help='JSONL with {"id": ..., "goal": "..."} or {"id": ..., "skills": [...]} '
+                                     'per line ("-" for stdin)')
+    batch.add_argument("--output", default="-", help="JSONL output path (default: stdout)")
+    batch.add_argument("--k", type=int, default=10, choices=range(1, MAX_K + 1), metavar="K")
+    batch.add_argument("--metric", choices=["coverage", "jaccard"], default="coverage",
+                       help="skill profile scoring")
+    batch.add_argument("--batch-size", type=int, default=10000, help="input lines scored together")
+    batch.set_defaults(run=run_batch)
+
+    server = commands.add_parser("serve", help="serve recommendations over HTTP (see app.service)")
+    server.add_argument("--host", default="127.0.0.1")
+    server.add_argument("--port", type=int, default=8765)
+    server.add_argument("--workers", type=int, default=None, help="scoring threads (default: up to 4)")
+    server.set_defaults(run=run_server)
+
+    args = parser.parse_args(argv)
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
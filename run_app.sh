@@ -1,6 +1,14 @@
 #!/bin/bash
+# Models first: preprocessing stores the cluster summaries computed with them.
+# Both only redo the work for data that changed since the last launch.
+echo "🧠 Updating clustering models..."
+python update_models.py
 echo "▶️ Running preprocessing..."
-python preprocess.py
+if [ -n "$APP_SHARED_DIR" ]; then
+    python preprocess.py --publish
+else
+    python preprocess.py
+fi
 
 echo "✅ Preprocessing complete."
 echo "🚀 Launching Streamlit app..."
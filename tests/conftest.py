@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Tests import the app and the scripts at the repository root (app.core,
+# preprocess, benchmarks) and read its bundled data
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
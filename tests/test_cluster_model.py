@@ -0,0 +1,16 @@
+import numpy as np
+
+from app.cluster_model import ClusterModel
+
+
+def test_partial_fit_keeps_centroids_in_the_fitted_space():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 4))
+    model = ClusterModel(ks=(3,)).fit(X)
+    mean, scale = model.scaler.mean_.copy(), model.scaler.scale_.copy()
+    X_old = model.transform(X[:50])
+    # Appended rows far from the old ones would move a scaler fitted on them
+    model.partial_fit(rng.normal(loc=5.0, size=(100, 4)))
+    np.testing.assert_array_equal(model.scaler.mean_, mean)
+    np.testing.assert_array_equal(model.scaler.scale_, scale)
+    np.testing.assert_array_equal(model.transform(X[:50]), X_old)
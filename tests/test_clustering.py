@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+from sklearn import metrics
+
+from app import clustering
+
+
+@pytest.mark.parametrize("n_rows", [400, 12000])
+def test_silhouette_matches_scikit_learn(n_rows):
+    rng = np.random.default_rng(n_rows)
+    X = rng.normal(size=(n_rows, 5))
+    labels = rng.integers(0, 4, n_rows)
+    # A cluster of one row scores 0
+    labels[0] = 4
+    sample_size = clustering.SILHOUETTE_SAMPLE if n_rows > clustering.SILHOUETTE_SAMPLE else None
+    expected = metrics.silhouette_score(X, labels, sample_size=sample_size, random_state=42)
+    assert clustering.silhouette(X, labels) == pytest.approx(expected, rel=1e-9)
+
+
+def test_silhouette_stops_when_progress_raises():
+    X = np.random.default_rng(0).normal(size=(2500, 3))
+    labels = np.arange(2500) % 3
+    calls = []
+
+    def progress(done, total):
+        calls.append((done, total))
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        clustering.silhouette(X, labels, random_state=7, progress=progress)
+    assert calls == [(clustering.SILHOUETTE_BLOCK_ROWS, 2500)]
@@ -0,0 +1,26 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.lazy import HEAVY_MODULES
+from benchmarks.imports import measure, page_imports
+from benchmarks.pages import PAGES
+
+# Per-page budget for the top-level imports, as `benchmarks.imports --budget-ms`
+BUDGET_MS = float(os.environ.get("IMPORT_BUDGET_MS", "1000"))
+
+
+@pytest.mark.parametrize("page", PAGES)
+def test_page_defers_heavy_modules(page):
+    # Only modules the page's imports load; streamlit itself loads some
+    # (plotly.graph_objects)
+    script = (f"import streamlit, sys\nloaded = set(sys.modules)\n{page_imports(page)}\n"
+              f"print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules and m not in loaded))")
+    out = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+    assert out.stdout.split() == []
+
+@pytest.mark.parametrize("page", PAGES)
+def test_page_imports_within_budget(page):
+    assert measure(page)["import_ms"] <= BUDGET_MS
@@ -0,0 +1,54 @@
+import threading
+
+from app.jobs import JobCancelled, JobRunner
+
+
+def test_job_starts_when_watched():
+    runner = JobRunner(workers=1)
+    started = threading.Event()
+    job = runner.submit(("job",), lambda job: started.set() or 42)
+    assert not started.wait(0.2)
+    assert runner.running() == []
+    job.acquire()
+    assert job.wait(5) and job.result() == 42
+    job.release()
+
+
+def test_cancelled_job_stops_at_report_and_resubmits():
+    runner = JobRunner(workers=1)
+    steps = threading.Semaphore(0)
+
+    def count(job, n):
+        for i in range(n):
+            steps.acquire()
+            job.report(i + 1, n)
+        return n
+
+    job = runner.submit(("count", 3), count, 3, label="Counting")
+    job.acquire()
+    steps.release()
+    job.release()
+    steps.release()
+    assert job.wait(5) and job.state == "cancelled"
+    try:
+        job.result()
+    except JobCancelled:
+        pass
+    again = runner.resubmit(job)
+    assert again is not job and again.label == "Counting"
+    for _ in range(3):
+        steps.release()
+    assert again.result(5) == 3
+
+
+def test_unwatched_jobs_are_evicted():
+    runner = JobRunner(workers=1, keep=3)
+    watched = runner.submit(("watched",), lambda job: threading.Event().wait(0.5))
+    watched.acquire()
+    # Submitted for inputs the page moved on from before watching them
+    for i in range(5):
+        runner.submit(("unwatched", i), lambda job, data: data, bytearray(1024))
+    assert len(runner.jobs()) == 3
+    assert watched in runner.jobs()
+    assert runner.jobs()[-1].key == ("unwatched", 4)
+    watched.release()
@@ -0,0 +1,23 @@
+import filecmp
+import re
+
+import pandas as pd
+
+import preprocess
+
+COURSES = "app/data/1_courses.csv"
+COURSES_PREPROCESSED = "app/data/courses_preprocessed.csv"
+
+
+def test_matcher_equals_per_skill_regex():
+    # The single-pass matcher finds exactly the skills r'\b<skill>\b' finds
+    patterns = [(skill, re.compile(r'\b' + re.escape(skill) + r'\b')) for skill in preprocess.skill_list]
+    for text in pd.read_csv(COURSES)['skills'].fillna('').str.lower():
+        expected = sorted((skill for skill, pattern in patterns if pattern.search(text)),
+                          key=preprocess.skill_list.index)
+        assert preprocess.parse_skills(text) == expected, text
+
+def test_rebuilds_courses_preprocessed(tmp_path):
+    dst = tmp_path / "courses_preprocessed.csv"
+    preprocess.preprocess_file(COURSES, str(dst))
+    assert filecmp.cmp(dst, COURSES_PREPROCESSED, shallow=False)
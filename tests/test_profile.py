@@ -0,0 +1,26 @@
+import tracemalloc
+
+from streamlit.testing.v1 import AppTest
+
+import app.core as core
+
+PAGE = """
+import streamlit as st
+from app.core import begin_page, end_page
+begin_page("profiled")
+if st.session_state.pop("fail", False):
+    raise RuntimeError("page failed")
+end_page()
+"""
+
+
+def test_profile_left_by_a_failed_run_is_stopped(tmp_path):
+    script = tmp_path / "page.py"
+    script.write_text(PAGE)
+    at = AppTest.from_file(str(script)).run()
+    at.session_state["_profile_next_rerun"] = True
+    at.session_state["fail"] = True
+    at.run()
+    assert at.exception and tracemalloc.is_tracing()
+    at.run()
+    assert not tracemalloc.is_tracing() and core._profiled_run is None
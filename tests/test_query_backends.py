@@ -0,0 +1,16 @@
+import pandas as pd
+import pytest
+
+from app.core import available_backends, run_query
+from benchmarks.query_backends import queries
+
+QUERIES = queries()
+
+
+@pytest.mark.parametrize("backend", available_backends())
+@pytest.mark.parametrize("label, source, query", QUERIES, ids=[label for label, _, _ in QUERIES])
+def test_backend_matches_pandas(backend, label, source, query):
+    expected = run_query(source, backend="pandas", **query)
+    result = run_query(source, backend=backend, **query)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_categorical=False,
+                                  check_index_type=False, check_column_type=False)
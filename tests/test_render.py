@@ -0,0 +1,21 @@
+from app.render import render_key
+
+levels = ['Beginner', 'Intermediate']
+
+
+def draw_levels(ax, counts):
+    ax.bar(levels, counts)
+
+def test_key_follows_globals():
+    global levels
+    before = render_key(draw_levels, [1, 2])
+    assert render_key(draw_levels, [1, 2]) == before
+    levels = ['Beginner', 'Advanced']
+    assert render_key(draw_levels, [1, 2]) != before
+
+def test_key_follows_closures():
+    def make(order):
+        def draw(ax, counts):
+            ax.bar(order, counts)
+        return draw
+    assert render_key(make(['a', 'b']), [1, 2]) != render_key(make(['b', 'a']), [1, 2])
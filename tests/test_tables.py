@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+
+from app.tables import csv_file, sortable, table_positions
+
+
+def test_arrow_list_columns_do_not_sort():
+    skills = pd.Series([["python"], ["sql", "r"]], dtype=pd.ArrowDtype(pa.list_(pa.string())))
+    assert not sortable(skills)
+    assert sortable(pd.Series(["b", "a"], dtype=pd.ArrowDtype(pa.string())))
+    assert not sortable(pd.Series([["python"], ["sql"]]))
+
+
+def test_sort_order_is_cached_per_table():
+    # Two tables shown at the same version must not share a permutation
+    short = pd.DataFrame({"rating": [3.0, 1.0, 2.0]})
+    long = pd.DataFrame({"rating": [5.0, 4.0, 1.0, 3.0, 2.0]})
+    assert table_positions(short, "short", "v1", sort="rating").tolist() == [1, 2, 0]
+    assert table_positions(long, "long", "v1", sort="rating").tolist() == [2, 4, 3, 1, 0]
+    filtered = table_positions(long, "long", "v1", rows=np.array([0, 3]), sort="rating")
+    assert filtered.tolist() == [3, 0]
+
+
+def test_csv_export_is_accepted_by_download_button():
+    df = pd.DataFrame({"course": ["a", "b,c", "d"], "rating": [4.5, 3.0, None], "level": ["x", "y", "z"]})
+    positions = np.array([2, 0])
+    columns = ["rating", "course"]
+    data, mime = convert_data_to_bytes_and_infer_mime(csv_file(df, positions, columns),
+                                                      unsupported_error=TypeError("unsupported"))
+    assert data == df.iloc[positions][columns].to_csv(index=False).encode("utf-8")
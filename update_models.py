@@ -0,0 +1,26 @@
+import argparse
+
+from app.cluster_model import CLUSTER_MODELS, DRIFT_THRESHOLD, update_model
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Update the stored clustering models with appended rows, refitting on drift.")
+    parser.add_argument("models", nargs="*", help=f"models to update (default: all of {', '.join(CLUSTER_MODELS)})")
+    parser.add_argument("--refit", action="store_true", help="fit from scratch even without drift")
+    args = parser.parse_args(argv)
+    unknown = set(args.models) - set(CLUSTER_MODELS)
+    if unknown:
+        parser.error(f"unknown models: {', '.join(sorted(unknown))}")
+
+    for name in args.models or CLUSTER_MODELS:
+        model = update_model(name, refit=args.refit)
+        last = model.history[-1]
+        change = f"{last['kind']} ({last['reason']})" if last["reason"] else f"update (+{last['rows_added']:,} rows)"
+        if last["drift"] is not None:
+            change += f", drift {last['drift']:.3f} vs threshold {DRIFT_THRESHOLD:g}"
+        print(f"{name}: v{model.version}, {model.n_rows:,} rows, last change: {change}")
+
+
+if __name__ == "__main__":
+    main()